@@ -0,0 +1,137 @@
+import random
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+
+# Synthetic catalog for benchmarks: books, users, carts and service requests.
+# Everything is derived from a seeded RNG, so the same sizes and seed always
+# produce the same database.
+
+PASSWORD = "benchmark"
+
+GENRES = [
+    "Fiction", "Fantasy", "Science Fiction", "Mystery", "Thriller", "Romance",
+    "Horror", "Historical", "Biography", "History", "Science", "Philosophy",
+    "Poetry", "Children", "Young Adult", "Travel", "Cooking", "Business",
+    "Self-Help", "Dystopian",
+]
+LANGUAGES = ["English", "Spanish", "French", "German", "Italian", "Portuguese", "Japanese", "Dutch"]
+WORDS = (
+    "shadow river night city garden silent empire lost secret winter house light "
+    "storm glass iron golden forgotten last journey dream fire ocean mountain star "
+    "crown blood song road island letter memory kingdom wolf raven summer stone "
+    "witness paper machine harbor whisper ember orchard voyage atlas cipher echo"
+).split()
+FIRST_NAMES = "Ana Ben Chloe Daniel Elena Farid Grace Hiro Ines Jonas Kira Liam Maya Noah Omar Priya Rosa Sam Tariq Uma".split()
+LAST_NAMES = "Adams Baker Costa Dubois Evans Fischer Garcia Hughes Ito Jensen Khan Lopez Moreau Novak Okafor Petrov Rossi Silva Tanaka Weber".split()
+STATUSES = ["pending", "pending", "pending", "approved", "rejected", "completed"]
+
+PUBLISHER_COUNT = 200
+
+
+def isbn_for(n: int) -> str:
+    return f"978{n:010d}"
+
+
+def email_for(n: int) -> str:
+    return f"user{n}@bookhub-bench.com"
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def book_record(rng: random.Random, n: int) -> dict:
+    return {
+        "title": _words(rng, rng.randint(2, 5)).title(),
+        "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "genre": rng.choice(GENRES),
+        "publication_date": f"{rng.randint(1900, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "price": round(rng.uniform(3, 120), 2),
+        "rating": round(rng.uniform(1, 5), 1),
+        "description": _words(rng, rng.randint(15, 40)).capitalize() + ".",
+        "image": f"https://example.com/covers/{n}.jpg",
+        "isbn": isbn_for(n),
+        "pages": rng.randint(80, 1200),
+        "language": rng.choice(LANGUAGES),
+        "publisher": f"Publisher {rng.randrange(PUBLISHER_COUNT)}",
+        "stock": rng.randint(0, 200),
+    }
+
+
+def service_request_record(rng: random.Random, user_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "title": _words(rng, 3).title(),
+        "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "genre": rng.choice(GENRES),
+        "description": _words(rng, 20),
+        "price": round(rng.uniform(3, 120), 2),
+        "contact_email": email_for(user_id),
+        "status": rng.choice(STATUSES),
+    }
+
+
+def _insert_chunks(db, table, rows, size: int = 5000):
+    for start in range(0, len(rows), size):
+        db.execute(insert(table), rows[start:start + size])
+    db.commit()
+
+
+def seed(books: int, users: int, cart_items: int, service_requests: int, seed_value: int = 42, log=print):
+    # Loads the synthetic data into the configured database (DATABASE_URL)
+    from core import config
+    from core.bulk import Batch, upsert_books
+    from core.security import get_password_hash
+    from db.init_db import init_db
+    from db.session import SessionLocal
+    from models.book import Book, CartItem, ServiceRequest
+    from models.user import User
+
+    init_db()
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        # Books go through the same batched upsert as the bulk import
+        now = datetime.utcnow()
+        for start in range(0, books, config.BULK_BATCH_SIZE):
+            batch = Batch()
+            for n in range(start, min(start + config.BULK_BATCH_SIZE, books)):
+                batch.rows.append({**book_record(rng, n), "version": 1, "updated_at": now})
+                batch.row_numbers.append(n)
+            upsert_books(db, batch)
+            log(f"books: {min(start + config.BULK_BATCH_SIZE, books)}/{books}")
+
+        # One hash for everyone: hashing each user would dominate seeding time
+        hashed = get_password_hash(PASSWORD)
+        _insert_chunks(db, User.__table__, [
+            {
+                "email": email_for(n),
+                "hashed_password": hashed,
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "is_active": True,
+            }
+            for n in range(users)
+        ])
+        log(f"users: {users}")
+
+        user_ids = list(db.scalars(select(User.id).order_by(User.id)))
+        book_ids = (db.scalar(select(func.min(Book.id))), db.scalar(select(func.max(Book.id))))
+        if user_ids and book_ids[0] is not None:
+            pairs = set()
+            while len(pairs) < min(cart_items, len(user_ids) * (book_ids[1] - book_ids[0] + 1)):
+                pairs.add((rng.choice(user_ids), rng.randint(*book_ids)))
+            _insert_chunks(db, CartItem.__table__, [
+                {"user_id": user_id, "book_id": book_id, "quantity": rng.randint(1, 3)}
+                for user_id, book_id in sorted(pairs)
+            ])
+            log(f"cart items: {len(pairs)}")
+
+            _insert_chunks(db, ServiceRequest.__table__, [
+                service_request_record(rng, rng.choice(user_ids)) for _ in range(service_requests)
+            ])
+            log(f"service requests: {service_requests}")
+    finally:
+        db.close()
@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+# Benchmark harness for the Book Hub API. Run from the backend directory:
+#   python -m benchmarks.run --books 10000 --users 1000
+#   python -m benchmarks.run --books 1000000 --mode uvicorn --output results.json
+#   python -m benchmarks.run --baseline results.json   (exit code 1 on a p95 regression)
+#
+# Seeds a synthetic database once per size (reused on later runs unless --reseed),
+# then drives every endpoint scenario in-process (ASGI transport, no network)
+# and/or against a uvicorn subprocess, and reports latency percentiles and
+# throughput per endpoint. Needs httpx; everything runs offline.
+# Also reports cold start: importing the app and running its startup (lifespan)
+# in a fresh interpreter, and how long uvicorn takes to answer its first request.
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR / "benchmarks" / ".data"
+MODES = ("inprocess", "uvicorn")
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def summarize(latencies, statuses: Counter, elapsed: float) -> dict:
+    ms = sorted(value * 1000 for value in latencies)
+    ok = sum(count for code, count in statuses.items() if isinstance(code, int) and code < 400)
+    return {
+        "requests": len(ms),
+        "ok": ok,
+        "errors": len(ms) - ok,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items(), key=str)},
+        "rps": round(len(ms) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(_percentile(ms, 50), 3),
+        "p95_ms": round(_percentile(ms, 95), 3),
+        "p99_ms": round(_percentile(ms, 99), 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+async def measure(client, ctx, factory, total: int, concurrency: int, record: bool = True):
+    import httpx
+
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(total))  # shared by all workers
+
+    async def worker():
+        for _ in remaining:
+            method, url, kwargs = factory(ctx)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError:
+                statuses["transport_error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed) if record and latencies else None
+
+
+async def run_scenarios(client, args, log) -> dict:
+    from benchmarks import data
+    from benchmarks.scenarios import SCENARIOS, Context
+
+    ctx = Context(args.books, args.users, args.seed)
+    response = await client.post("/auth/token", json={"email": data.email_for(0), "password": data.PASSWORD})
+    response.raise_for_status()
+    ctx.token = response.json()["access_token"]
+
+    results = {}
+    for name, (factory, writes, cap) in SCENARIOS.items():
+        if args.endpoints and not any(name.startswith(prefix) for prefix in args.endpoints):
+            continue
+        if writes and args.skip_writes:
+            continue
+        total = min(args.requests, cap) if cap else args.requests
+        await measure(client, ctx, factory, min(args.warmup, total), args.concurrency, record=False)
+        results[name] = await measure(client, ctx, factory, total, args.concurrency)
+        log(f"  {name:<26} {results[name]['rps']:>9} req/s  p50 {results[name]['p50_ms']:>8} ms  "
+            f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  errors {results[name]['errors']}")
+    return results
+
+
+async def run_inprocess(args, log, startup: dict) -> dict:
+    import httpx
+    import main
+
+    # ASGITransport sends no lifespan events: run startup/shutdown around the client
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_scenarios(client, args, log)
+
+
+# Runs in a fresh interpreter; prints one JSON line
+STARTUP_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+from core import metrics
+print(json.dumps({"import_seconds": imported - started, "startup_seconds": ready - imported, "phases": metrics.startup_seconds}))
+"""
+
+
+def measure_startup(runs: int, log) -> dict:
+    # Median of `runs` cold starts: interpreter + imports, `import main`, lifespan startup
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        probe = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE], cwd=BACKEND_DIR, env=os.environ.copy(),
+            capture_output=True, text=True, check=True,
+        )
+        sample = json.loads(probe.stdout.strip().splitlines()[-1])
+        sample["process_seconds"] = time.perf_counter() - started
+        samples.append(sample)
+
+    median = lambda values: round(statistics.median(values), 4)
+    result = {
+        "runs": runs,
+        "process_seconds": median(sample["process_seconds"] for sample in samples),
+        "import_seconds": median(sample["import_seconds"] for sample in samples),
+        "startup_seconds": median(sample["startup_seconds"] for sample in samples),
+        "phases": {
+            phase: median(sample["phases"].get(phase, 0.0) for sample in samples)
+            for phase in samples[0]["phases"]
+        },
+    }
+    log(f"  import {result['import_seconds']:.3f}s  startup {result['startup_seconds']:.3f}s  "
+        f"whole process {result['process_seconds']:.3f}s  {result['phases']}")
+    return result
+
+
+async def _wait_until_up(client, process, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+async def run_uvicorn(args, log, startup: dict) -> dict:
+    import httpx
+
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    launched = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy())
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            await _wait_until_up(client, process)
+            startup["uvicorn_ready_seconds"] = round(time.perf_counter() - launched, 3)
+            log(f"  uvicorn answered after {startup['uvicorn_ready_seconds']}s")
+            return await run_scenarios(client, args, log)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, max_regression: float, log) -> bool:
+    # True if no endpoint's p95 got worse than the baseline by more than max_regression
+    ok = True
+    for mode, endpoints in current["results"].items():
+        for name, result in endpoints.items():
+            before = baseline.get("results", {}).get(mode, {}).get(name)
+            if not before or not result:
+                continue
+            change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+            flag = ""
+            if change > max_regression:
+                ok = False
+                flag = "  REGRESSION"
+            log(f"  {mode:<10} {name:<26} p95 {before['p95_ms']:>8} -> {result['p95_ms']:>8} ms ({change:+.0%}){flag}")
+
+    # Cold start is compared the same way (informational when the baseline predates it)
+    for key in ("import_seconds", "startup_seconds"):
+        before = baseline.get("startup", {}).get(key)
+        after = current.get("startup", {}).get(key)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        flag = ""
+        if change > max_regression:
+            ok = False
+            flag = "  REGRESSION"
+        log(f"  {'startup':<10} {key:<26} {before:>8}s -> {after:>8}s ({change:+.0%}){flag}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Book Hub API benchmarks")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--cart-items", type=int, help="Defaults to 3 per user")
+    parser.add_argument("--service-requests", type=int, help="Defaults to 1 per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="SQLite file to seed/use (default: benchmarks/.data/, one file per size)")
+    parser.add_argument("--reseed", action="store_true", help="Rebuild the database even if it exists")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), help="Comma separated name prefixes, e.g. books,cart.view")
+    parser.add_argument("--skip-writes", action="store_true", help="Only run read scenarios (keeps the database unchanged)")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Cold starts to measure (0 skips)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p95 increase over the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+    args.cart_items = args.users * 3 if args.cart_items is None else args.cart_items
+    args.service_requests = args.users if args.service_requests is None else args.service_requests
+    log = lambda message: print(message, file=sys.stderr, flush=True)
+
+    # The app reads its settings at import time, so point it at the benchmark database first
+    db_path = Path(args.db) if args.db else DATA_DIR / (
+        f"bench-b{args.books}-u{args.users}-c{args.cart_items}-s{args.service_requests}-r{args.seed}.db"
+    )
+    db_path = db_path.resolve()
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # Every benchmark request comes from one client: don't measure the rate limiter's 429s
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    if args.reseed or not db_path.exists():
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+        from benchmarks.data import seed
+
+        started = time.perf_counter()
+        log(f"Seeding {db_path}")
+        seed(args.books, args.users, args.cart_items, args.service_requests, args.seed, log=log)
+        log(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    from core import config
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": str(db_path),
+            "sizes": {
+                "books": args.books, "users": args.users,
+                "cart_items": args.cart_items, "service_requests": args.service_requests,
+            },
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "config": {
+                "USE_ASYNC_DB": config.USE_ASYNC_DB,
+                "CACHE_BACKEND": config.CACHE_BACKEND,
+                "DB_POOL_SIZE": config.DB_POOL_SIZE,
+                "BCRYPT_ROUNDS": config.BCRYPT_ROUNDS,
+                "RATE_LIMIT_ENABLED": config.RATE_LIMIT_ENABLED,
+                "INIT_DB_ON_STARTUP": config.INIT_DB_ON_STARTUP,
+                "WARMUP_ON_STARTUP": config.WARMUP_ON_STARTUP,
+            },
+        },
+        "startup": {},
+        "results": {},
+    }
+
+    if args.startup_runs:
+        log("cold start:")
+        report["startup"] = measure_startup(args.startup_runs, log)
+
+    modes = MODES if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        log(f"{mode}:")
+        runner = run_inprocess if mode == "inprocess" else run_uvicorn
+        report["results"][mode] = asyncio.run(runner(args, log, report["startup"]))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        log("Compared with baseline:")
+        baseline = json.loads(Path(args.baseline).read_text())
+        return 0 if compare(baseline, report, args.max_regression, log) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
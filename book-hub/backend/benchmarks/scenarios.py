@@ -0,0 +1,110 @@
+import random
+import uuid
+
+from benchmarks import data
+
+
+# One scenario per endpoint being measured. Each returns the request to send
+# as (method, url, keyword arguments for httpx), drawing ids from the seeded
+# ranges so reads hit existing rows and the cache sees a realistic spread.
+
+
+class Context:
+    def __init__(self, books: int, users: int, seed_value: int):
+        self.rng = random.Random(seed_value)
+        self.books = books
+        self.users = users
+        self.token = None
+
+    def book_id(self) -> int:
+        return self.rng.randint(1, self.books)
+
+    def user_id(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def auth(self) -> dict:
+        return {"headers": {"Authorization": f"Bearer {self.token}"}}
+
+
+def _books_list(ctx):
+    return "GET", "/books/", {"params": {"limit": 20}}
+
+
+def _books_list_deep(ctx):
+    return "GET", "/books/", {"params": {"limit": 20, "skip": ctx.rng.randint(0, max(ctx.books - 20, 0)), "count": "none"}}
+
+
+def _books_search(ctx):
+    return "GET", "/books/", {"params": {"q": ctx.rng.choice(data.WORDS), "limit": 20}}
+
+
+def _books_browse(ctx):
+    params = {
+        "genre": ctx.rng.choice(data.GENRES),
+        "sort": ctx.rng.choice(["price", "rating", "title"]),
+        "order": ctx.rng.choice(["asc", "desc"]),
+        "limit": 20,
+    }
+    return "GET", "/books/", {"params": params}
+
+
+def _books_facets(ctx):
+    return "GET", "/books/facets", {}
+
+
+def _books_get(ctx):
+    return "GET", f"/books/{ctx.book_id()}", {}
+
+
+def _books_create(ctx):
+    book = data.book_record(ctx.rng, 0)
+    book["isbn"] = f"bench-{uuid.uuid4().hex}"
+    return "POST", "/books/", {"json": book}
+
+
+def _cart_list(ctx):
+    return "GET", f"/cart/user/{ctx.user_id()}", {}
+
+
+def _cart_view(ctx):
+    return "GET", f"/cart/user/{ctx.user_id()}/view", {}
+
+
+def _cart_add(ctx):
+    return "POST", "/cart/", {"json": {"user_id": ctx.user_id(), "book_id": ctx.book_id(), "quantity": 1}}
+
+
+def _service_requests_list(ctx):
+    return "GET", "/service-requests/", {"params": {"status": "pending", "limit": 20}}
+
+
+def _service_requests_create(ctx):
+    return "POST", "/service-requests/", {"json": data.service_request_record(ctx.rng, ctx.user_id())}
+
+
+def _auth_login(ctx):
+    return "POST", "/auth/token", {"json": {"email": data.email_for(ctx.rng.randrange(ctx.users)), "password": data.PASSWORD}}
+
+
+def _auth_me(ctx):
+    return "GET", "/auth/me", ctx.auth()
+
+
+# name -> (request factory, writes?, request cap). Logins are capped: each one
+# is a full bcrypt verification and would otherwise dominate the run.
+SCENARIOS = {
+    "books.list": (_books_list, False, None),
+    "books.list_deep": (_books_list_deep, False, None),
+    "books.search": (_books_search, False, None),
+    "books.browse": (_books_browse, False, None),
+    "books.facets": (_books_facets, False, None),
+    "books.get": (_books_get, False, None),
+    "books.create": (_books_create, True, None),
+    "cart.list": (_cart_list, False, None),
+    "cart.view": (_cart_view, False, None),
+    "cart.add": (_cart_add, True, None),
+    "service_requests.list": (_service_requests_list, False, None),
+    "service_requests.create": (_service_requests_create, True, None),
+    "auth.login": (_auth_login, False, 100),
+    "auth.me": (_auth_me, False, None),
+}
@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import config
+
+
+# Command line tools for the Book Hub backend.
+#   python cli.py init-db
+#   python cli.py import-books data/sample_books.jsonl
+#   python cli.py import-books feed.csv --batch-size 5000
+#   python cli.py build-similar
+
+
+def init_database(args):
+    # For deploys with INIT_DB_ON_STARTUP=false: migrate once, before the workers start
+    from db.init_db import init_db
+
+    started = time.perf_counter()
+    init_db()
+    print(json.dumps({"seconds": round(time.perf_counter() - started, 3)}, indent=2))
+    return 0
+
+
+def import_books(args):
+    from core.bulk import ImportReport, iter_records, next_batch, upsert_books
+    from db.init_db import init_db
+    from db.session import SessionLocal
+
+    init_db()
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    report = ImportReport(args.max_errors)
+    started = time.perf_counter()
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    db = SessionLocal()
+    # Parse the next batch in a thread while the current one is written
+    with ThreadPoolExecutor(max_workers=1) as parser:
+        try:
+            records = iter_records(source, fmt)
+            pending = parser.submit(next_batch, records, args.batch_size)
+            while True:
+                batch = pending.result()
+                if not batch:
+                    break
+                pending = parser.submit(next_batch, records, args.batch_size)
+                report.add(batch, upsert_books(db, batch))
+        finally:
+            db.close()
+        if source is not sys.stdin:
+            source.close()
+
+    elapsed = time.perf_counter() - started
+    result = report.as_dict()
+    processed = report.created + report.updated + report.failed
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_second"] = round(processed / elapsed) if elapsed else None
+    print(json.dumps(result, indent=2))
+    return 1 if report.failed else 0
+
+
+def build_similar(args):
+    from core import similar
+    from db.init_db import init_db
+
+    if not similar.NUMPY_INSTALLED:
+        print("build-similar needs numpy: pip install numpy", file=sys.stderr)
+        return 1
+    init_db()
+    started = time.perf_counter()
+    result = similar.rebuild()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py", description="Book Hub backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    initializer = commands.add_parser("init-db", help="Run the migrations and build the search/facet indexes")
+    initializer.set_defaults(handler=init_database)
+
+    importer = commands.add_parser("import-books", help="Upsert books from a JSON Lines or CSV file (by ISBN)")
+    importer.add_argument("path", help="File to import, or - for stdin")
+    importer.add_argument("--format", choices=["jsonl", "csv"], help="Defaults to the file extension")
+    importer.add_argument("--batch-size", type=int, default=config.BULK_BATCH_SIZE)
+    importer.add_argument("--max-errors", type=int, default=config.BULK_MAX_ERRORS)
+    importer.set_defaults(handler=import_books)
+
+    similar = commands.add_parser("build-similar", help="Rebuild the similar-books index from the catalog")
+    similar.set_defaults(handler=build_similar)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.facets import begin_bulk_facets, end_bulk_facets
+from core.search import begin_bulk_sync, end_bulk_sync
+from models.book import Book
+from schemas.book import BookCreate
+
+
+# Bulk catalog import (JSON Lines or CSV), shared by POST /books/bulk and cli.py.
+# Records are validated in batches and upserted on `isbn` with one executemany
+# per batch inside its own transaction; bad rows are reported, not fatal.
+
+FORMATS = ("jsonl", "csv")
+BOOK_FIELDS = list(BookCreate.model_fields)
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Record]:
+    # Yields (row number, raw record or None, parse error or None)
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, row, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, record, None
+
+
+class Batch:
+    def __init__(self):
+        self.rows: List[dict] = []
+        self.row_numbers: List[int] = []
+        self.errors: List[dict] = []
+
+    def __bool__(self):
+        return bool(self.rows or self.errors)
+
+
+def next_batch(records: Iterator[Record], size: int) -> Batch:
+    # Pull and validate up to `size` records
+    batch = Batch()
+    now = datetime.utcnow()
+    for number, raw, error in islice(records, size):
+        if error:
+            batch.errors.append({"row": number, "error": error})
+            continue
+        try:
+            book = BookCreate.model_validate(raw)
+        except ValidationError as exc:
+            batch.errors.append({
+                "row": number,
+                "isbn": raw.get("isbn"),
+                "error": "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()),
+            })
+            continue
+        batch.rows.append({**book.model_dump(), "version": 1, "updated_at": now})
+        batch.row_numbers.append(number)
+    return batch
+
+
+def _upsert_statement(dialect_name: str):
+    insert = {"sqlite": sqlite_insert, "postgresql": pg_insert}.get(dialect_name)
+    if insert is None:
+        raise RuntimeError(f"Bulk import is not supported on {dialect_name}")
+
+    stmt = insert(Book.__table__)
+    changes = {field: stmt.excluded[field] for field in BOOK_FIELDS if field != "isbn"}
+    changes["version"] = Book.__table__.c.version + literal_column("1")
+    changes["updated_at"] = stmt.excluded.updated_at
+    return stmt.on_conflict_do_update(index_elements=["isbn"], set_=changes)
+
+
+def _executemany(db: Session, stmt, rows: List[dict]):
+    # Compile once and hand plain parameter tuples to the driver: at tens of
+    # thousands of rows the per-row parameter processing of Session.execute
+    # costs as much as SQLite itself.
+    conn = db.connection()
+    compiled = stmt.compile(dialect=conn.dialect, column_keys=list(rows[0]))
+    process_date = Book.__table__.c.updated_at.type.bind_processor(conn.dialect)
+    if process_date:
+        rows = [{**row, "updated_at": process_date(row["updated_at"])} for row in rows]
+    if compiled.positiontup:
+        params = [tuple(row[key] for key in compiled.positiontup) for row in rows]
+    else:
+        params = rows
+    conn.exec_driver_sql(str(compiled), params)
+
+
+def upsert_books(db: Session, batch: Batch) -> dict:
+    # One transaction per batch. Returns created/updated counts, the ids of the
+    # books written and row errors.
+    result = {"created": 0, "updated": 0, "book_ids": [], "errors": []}
+    if not batch.rows:
+        return result
+
+    # Last occurrence of an isbn within a batch wins
+    latest = {}
+    for number, row in zip(batch.row_numbers, batch.rows):
+        latest[row["isbn"]] = (number, row)
+    numbers = [number for number, _ in latest.values()]
+    rows = [row for _, row in latest.values()]
+
+    isbns = list(latest)
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    existing = set(db.scalars(select(Book.isbn).where(Book.isbn.in_(isbns))))
+    try:
+        # Derived indexes (full-text search, facet counts) are updated once for the whole batch
+        begin_bulk_sync(db, isbns)
+        begin_bulk_facets(db, isbns)
+        _executemany(db, stmt, rows)
+        end_bulk_facets(db, isbns)
+        end_bulk_sync(db, isbns)
+        db.commit()
+    except IntegrityError:
+        # Some other constraint failed; retry row by row (triggers active) to find the culprits
+        db.rollback()
+        rows_ok = []
+        for number, row in zip(numbers, rows):
+            try:
+                with db.begin_nested():
+                    db.execute(stmt, [row])
+                rows_ok.append(row)
+            except IntegrityError as exc:
+                result["errors"].append({"row": number, "isbn": row["isbn"], "error": str(exc.orig)})
+        db.commit()
+        rows = rows_ok
+
+    updated = sum(1 for row in rows if row["isbn"] in existing)
+    result["updated"] = updated
+    result["created"] = len(rows) - updated
+    if rows:
+        result["book_ids"] = db.scalars(select(Book.id).where(Book.isbn.in_([row["isbn"] for row in rows]))).all()
+    return result
+
+
+class ImportReport:
+    def __init__(self, max_errors: int, max_book_ids: int = 0):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.max_errors = max_errors
+        # Ids of the books written, while there are at most max_book_ids; None past that
+        self.book_ids: Optional[set] = set()
+        self.max_book_ids = max_book_ids
+
+    def add_errors(self, errors: List[dict]):
+        self.failed += len(errors)
+        room = self.max_errors - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def add(self, batch: Batch, result: dict):
+        self.created += result["created"]
+        self.updated += result["updated"]
+        self.add_errors(batch.errors + result["errors"])
+        if self.book_ids is not None:
+            self.book_ids.update(result["book_ids"])
+            if len(self.book_ids) > self.max_book_ids:
+                self.book_ids = None
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
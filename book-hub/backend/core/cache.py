@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from core import config
+
+
+# Read-through cache for catalog reads.
+#
+# Values are JSON-compatible (dicts/lists), so any backend can store them.
+# Invalidation is by generation: every key embeds the current generation of its
+# group (e.g. "catalog"), and a write just bumps the generation. Entries written
+# by a request that read the database before the bump land under the old
+# generation and can never be served, so there is no stale-set race.
+
+_MISSING = object()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class MemoryBackend:
+    # Per-process LRU with per-entry TTL
+    def __init__(self, max_entries: int, stats: CacheStats):
+        self.max_entries = max_entries
+        self.stats = stats
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.stats.incr("expirations")
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr_counter(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    # Shared across workers; LRU eviction is left to the server's maxmemory-policy
+    def __init__(self, url: str, stats: CacheStats):
+        import redis  # optional dependency, only needed for CACHE_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.stats = stats
+
+    def get(self, key: str):
+        raw = self.client.get(key)
+        if raw is None:
+            return _MISSING
+        return json.loads(raw)
+
+    def get_many(self, keys: list) -> list:
+        # One round trip (MGET) for the lot
+        return [_MISSING if raw is None else json.loads(raw) for raw in self.client.mget(keys)] if keys else []
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.client.set(key, json.dumps(value, separators=(",", ":")), px=int(ttl * 1000))
+
+    def get_counter(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+    def incr_counter(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def size(self) -> int:
+        return int(self.client.dbsize())
+
+
+class Cache:
+    def __init__(self, backend, stats: CacheStats, prefix: str, default_ttl: float):
+        self.backend = backend
+        self.stats = stats
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def key(self, group: str, *parts, **params) -> str:
+        # Take the key *before* reading the database: it pins the generation
+        return self._key(group, self.backend.get_counter(f"{self.prefix}:gen:{group}"), parts, params)
+
+    def keys(self, group: str, parts_list: list) -> list:
+        # Same as [key(group, *parts) for parts in parts_list], reading the generation once
+        generation = self.backend.get_counter(f"{self.prefix}:gen:{group}")
+        return [self._key(group, generation, tuple(parts), {}) for parts in parts_list]
+
+    def _key(self, group: str, generation: int, parts: tuple, params: dict) -> str:
+        raw = json.dumps([parts, params], sort_keys=True, default=str, separators=(",", ":"))
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{group}:{generation}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.backend.get(key)
+        if value is _MISSING:
+            self.stats.incr("misses")
+            return None
+        self.stats.incr("hits")
+        return value
+
+    def get_many(self, keys: list) -> list:
+        values = [None if value is _MISSING else value for value in self.backend.get_many(keys)]
+        hits = sum(value is not None for value in values)
+        self.stats.incr("hits", hits)
+        self.stats.incr("misses", len(values) - hits)
+        return values
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.backend.set(key, value, ttl or self.default_ttl)
+
+    def invalidate(self, group: str):
+        self.backend.incr_counter(f"{self.prefix}:gen:{group}")
+        self.stats.incr("invalidations")
+
+    def info(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            **self.stats.as_dict(),
+        }
+
+
+def create_cache() -> Cache:
+    stats = CacheStats()
+    if config.CACHE_BACKEND == "redis":
+        backend = RedisBackend(config.CACHE_URL, stats)
+    else:
+        backend = MemoryBackend(config.CACHE_MAX_ENTRIES, stats)
+    return Cache(backend, stats, prefix="bookhub", default_ttl=config.CACHE_TTL_SECONDS)
+
+
+cache = create_cache()
@@ -0,0 +1,153 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from core import config
+
+try:
+    import brotli  # optional dependency: pip install brotli
+except ImportError:
+    brotli = None
+
+
+# Negotiated response compression (Accept-Encoding -> Content-Encoding).
+# Whole bodies are compressed in one go once they reach COMPRESSION_MIN_BYTES;
+# streamed bodies (e.g. GET /books/export) are compressed chunk by chunk and
+# flushed after each one so the client keeps receiving data as it is produced.
+# Responses that already have a Content-Encoding, or whose type does not
+# compress (images, archives), pass through untouched.
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def supported_encodings():
+    # In order of preference when the client rates them equally
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    # Best supported coding in Accept-Encoding, honouring q-values (q=0 refuses one)
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith("+json")
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=config.BROTLI_QUALITY)
+        else:
+            self._br = None
+            # wbits=31: zlib stream with a gzip header and trailer
+            self._gz = zlib.compressobj(config.GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Compressed bytes for `data`, flushed so they can be sent right away
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush()
+
+
+class CompressionMiddleware:
+    # Plain ASGI middleware, like MetricsMiddleware
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = config.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not config.COMPRESSION:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows how big the response is
+                start = message
+                headers = Headers(raw=start.get("headers", []))
+                passthrough = (
+                    start["status"] < 200 or start["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not _compressible(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    # Streamed: the final length isn't known up front
+                    del headers["Content-Length"]
+                    body = compressor.chunk(body)
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                start["headers"] = headers.raw
+                await send(start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+
+# HTTP conditional requests (RFC 9110 §13): ETag / If-None-Match and
+# Last-Modified / If-Modified-Since, answered with 304 Not Modified.
+# ETags are weak because the bytes on the wire may differ (e.g. compression)
+# while the representation is the same.
+
+CACHE_CONTROL = "no-cache"
+
+
+def book_etag(book_id: int, version: int) -> str:
+    return f'W/"b{book_id}.{version}"'
+
+
+def listing_etag(total, next_cursor, items: Iterable) -> str:
+    # A page is identified by the (id, version) of its items plus its paging metadata
+    h = hashlib.sha1(f"{total}|{next_cursor}".encode("utf-8"))
+    for item in items:
+        h.update(f"|{item.id}.{getattr(item, 'version', None)}".encode("utf-8"))
+    return f'W/"l{h.hexdigest()[:20]}"'
+
+
+def content_etag(prefix: str, body) -> str:
+    # For small derived documents with no version of their own: hash the content
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return f'W/"{prefix}{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+
+def if_match_failed(if_match: Optional[str], etag: str) -> bool:
+    # If-Match on writes: True when the client's copy is out of date (412). Our
+    # ETags name a version rather than exact bytes, so they compare weakly here too.
+    if if_match is None:
+        return False
+    return not _etag_matches(if_match, etag)
+
+
+def conditional(request: Request, response: Response, etag: str, last_modified: Optional[str] = None):
+    # Sets validators on `response`; returns a 304 response if the client's copy is current
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    # If-None-Match takes precedence; If-Modified-Since is only used without it
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif if_modified_since is not None and last_modified:
+        fresh = _not_modified_since(if_modified_since, last_modified)
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
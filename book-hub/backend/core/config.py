@@ -0,0 +1,144 @@
+import os
+
+
+# Runtime settings, read from environment variables
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Database
+# USE_ASYNC_DB=false serves every request through the blocking engine in the
+# threadpool (the original behaviour), e.g. for side-by-side benchmarks.
+USE_ASYNC_DB = env_bool("USE_ASYNC_DB", True)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Optional: defaults to DATABASE_URL with the async driver (aiosqlite / asyncpg)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool (ignored for in-memory SQLite; pre-ping only applies to server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Observability: statements at least this slow are logged (0 disables), and
+# whether responses carry a Server-Timing header (app and database time)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SERVER_TIMING = env_bool("SERVER_TIMING", True)
+
+# Startup (main.py lifespan). INIT_DB_ON_STARTUP runs the migrations and builds
+# the search/facet indexes in every worker as it starts; turn it off where the
+# deploy runs `python cli.py init-db` once instead. The warm-up opens the
+# connection pool and requests WARMUP_PATHS once, so the first real requests
+# find warm connections and caches.
+INIT_DB_ON_STARTUP = env_bool("INIT_DB_ON_STARTUP", True)
+WARMUP_ON_STARTUP = env_bool("WARMUP_ON_STARTUP", True)
+WARMUP_PATHS = os.getenv("WARMUP_PATHS", "/books/,/books/facets")
+
+# Rate limiting (core/ratelimit.py): a token bucket per client (the user of a
+# valid bearer token, else the client address) refilled at RATE_LIMIT_PER_SECOND
+# up to RATE_LIMIT_BURST. Requests cost 1 token unless a RATE_LIMIT_COSTS rule
+# matches: "METHOD PATH=COST" or "METHOD PATH?PARAM=COST" (only when that query
+# parameter is present), comma separated, first match wins; PATH may end in *.
+# Buckets live in this process ("memory"), in Redis ("redis", RATE_LIMIT_URL)
+# or in your own store ("package.module:attribute").
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+RATE_LIMIT_COSTS = os.getenv(
+    "RATE_LIMIT_COSTS",
+    "POST /auth/token=10, POST /auth/register=10, POST /books/bulk=20, GET /books/export=20, "
+    "GET /books/?title=5, GET /books/?author=5, GET /books/?publisher=5, GET /books/?q=2",
+)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", os.getenv("CACHE_URL", "redis://localhost:6379/0"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+# Take the client address from X-Forwarded-For (only behind a proxy that sets it)
+RATE_LIMIT_TRUST_FORWARDED = env_bool("RATE_LIMIT_TRUST_FORWARDED", False)
+
+# Admission control: past MAX_CONCURRENT_REQUESTS in flight, or while waiting
+# for a database connection has recently taken over SHED_POOL_WAIT_MS on
+# average, new requests get 503 with Retry-After instead of queueing (0 disables)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "200"))
+SHED_POOL_WAIT_MS = float(os.getenv("SHED_POOL_WAIT_MS", "250"))
+# Never limited: monitoring must keep working under load
+ADMISSION_EXEMPT_PATHS = os.getenv("ADMISSION_EXEMPT_PATHS", "/metrics,/cache/stats")
+
+# Response compression: gzip, or brotli when the brotli package is installed and
+# the client prefers it. Bodies under COMPRESSION_MIN_BYTES are sent as they are.
+COMPRESSION = env_bool("COMPRESSION", True)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Catalog read cache: "memory" (per process) or "redis" (shared, needs the redis package)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_LIST_TTL_SECONDS = float(os.getenv("CACHE_LIST_TTL_SECONDS", "30"))
+
+# Auth: verified tokens kept per worker, and how long a looked-up user is reused
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+# Password hashing: bcrypt cost (existing hashes are upgraded on login when it
+# changes), threads dedicated to hashing and how many more hashes may wait
+# before register/login answer 429
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUED = int(os.getenv("PASSWORD_HASH_MAX_QUEUED", "16"))
+
+# Bulk import (POST /books/bulk, cli.py import-books)
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "2000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+# Request bodies are spooled to disk beyond this size
+BULK_SPOOL_MAX_BYTES = int(os.getenv("BULK_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Catalog export (GET /books/export): rows fetched per round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Batch lookup (GET /books/batch): most ids/ISBNs accepted per request
+BOOK_BATCH_MAX = int(os.getenv("BOOK_BATCH_MAX", "300"))
+
+# Similar books (GET /books/{id}/similar, needs numpy): directory of the
+# precomputed, memory-mapped index (shared by every worker on the host),
+# neighbours kept per book, and the size of the hashed description features.
+# Changes to more books than SIMILAR_REBUILD_THRESHOLD at once rebuild it.
+SIMILAR_DIR = os.getenv("SIMILAR_DIR", "./similar")
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "20"))
+SIMILAR_TEXT_DIM = int(os.getenv("SIMILAR_TEXT_DIM", "128"))
+SIMILAR_REBUILD_THRESHOLD = int(os.getenv("SIMILAR_REBUILD_THRESHOLD", "1000"))
+
+# Background jobs (service-request processing). Each app process runs
+# JOB_WORKERS worker tasks (JOBS_ENABLED=false runs none), claiming up to
+# JOB_BATCH_SIZE jobs at a time and polling every JOB_POLL_SECONDS when idle.
+# A claimed job that isn't finished within JOB_LEASE_SECONDS (its worker died)
+# is picked up again. Failures are retried with backoff up to JOB_MAX_ATTEMPTS;
+# finished jobs are deleted after JOB_RETENTION_HOURS.
+JOBS_ENABLED = env_bool("JOBS_ENABLED", True)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "50"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+# Notifications to service-request contacts: "log" (logger bookhub.notify),
+# "outbox" (one JSON line per message appended to NOTIFY_OUTBOX_PATH) or
+# "package.module:attribute" naming your own sender
+NOTIFIER = os.getenv("NOTIFIER", "log")
+NOTIFY_OUTBOX_PATH = os.getenv("NOTIFY_OUTBOX_PATH", "./outbox.jsonl")
@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import select
+
+from models.book import Book
+
+
+# Catalog export encoders. Each batch of rows becomes one chunk of the
+# streamed response, so memory use is bounded by the batch size.
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXPORT_COLUMNS = [column.name for column in Book.__table__.columns]
+
+
+def export_statement():
+    return select(*Book.__table__.columns).order_by(Book.id)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(rows: List[dict]) -> bytes:
+    return "".join(
+        json.dumps(dict(row), default=_json_default, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_csv(rows: List[dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, (datetime, date)) else value
+            for value in (row[column] for column in EXPORT_COLUMNS)
+        ])
+    return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,192 @@
+from typing import List
+
+from sqlalchemy import bindparam, case, func, literal, select, text, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from core.search import PAUSE_TABLE
+from models.book import Book
+
+
+# Facet counts for catalog browsing: books per genre / language / publisher and
+# per price / rating bucket.
+# On SQLite they live in an aggregate table kept up to date by triggers on
+# `books` (one small upsert per changed facet value), so reading them is a
+# scan of a few hundred rows instead of GROUP BYs over the catalog. Bulk loads
+# pause the triggers like the full-text index does (see core/search.py) and
+# apply each batch's counts set-based. Other databases aggregate on the fly.
+
+FACETS_TABLE = "book_facets"
+CATEGORY_FACETS = ("genre", "language", "publisher")
+
+# Lower bounds of the histogram buckets; the last bucket is open-ended
+BUCKETS = {
+    "price": (0, 10, 20, 30, 50, 100),
+    "rating": (0, 1, 2, 3, 4),
+}
+
+
+def bucket_label(bounds, index: int) -> str:
+    low = bounds[index]
+    if index + 1 < len(bounds):
+        return f"{low}-{bounds[index + 1]}"
+    return f"{low}+"
+
+
+def _bucket_sql(expr: str, bounds) -> str:
+    # CASE mapping a value to its bucket label (values below the first bound go to the first bucket)
+    whens = " ".join(
+        f"WHEN {expr} < {bounds[i + 1]} THEN '{bucket_label(bounds, i)}'"
+        for i in range(len(bounds) - 1)
+    )
+    return f"CASE WHEN {expr} IS NULL THEN NULL {whens} ELSE '{bucket_label(bounds, len(bounds) - 1)}' END"
+
+
+def _facet_values_sql(src: str) -> str:
+    # One (facet, value) row per facet of the book row `src` (new/old in triggers, b elsewhere)
+    parts = [f"SELECT '{name}' AS facet, {src}.{name} AS value" for name in CATEGORY_FACETS]
+    parts += [f"SELECT '{name}', {_bucket_sql(f'{src}.{name}', bounds)}" for name, bounds in BUCKETS.items()]
+    return " UNION ALL ".join(parts)
+
+
+def _facet_counts_sql(where: str = "") -> str:
+    # (facet, value, n) aggregated over the books matching `where`
+    parts = [f"SELECT '{name}' AS facet, b.{name} AS value FROM books b {where}" for name in CATEGORY_FACETS]
+    parts += [
+        f"SELECT '{name}', {_bucket_sql(f'b.{name}', bounds)} FROM books b {where}"
+        for name, bounds in BUCKETS.items()
+    ]
+    return f"SELECT facet, value, COUNT(*) AS n FROM ({' UNION ALL '.join(parts)}) WHERE value IS NOT NULL GROUP BY facet, value"
+
+
+def _add_sql(values_sql: str) -> str:
+    return f"""INSERT INTO {FACETS_TABLE} (facet, value, count)
+        SELECT facet, value, 1 FROM ({values_sql}) WHERE value IS NOT NULL
+        ON CONFLICT (facet, value) DO UPDATE SET count = count + 1;"""
+
+
+def _remove_sql(values_sql: str) -> str:
+    return f"""UPDATE {FACETS_TABLE} SET count = count - 1
+        WHERE (facet, value) IN (SELECT facet, value FROM ({values_sql}));"""
+
+
+def _facets_ddl():
+    columns = ", ".join(CATEGORY_FACETS + tuple(BUCKETS))
+    active = f"WHEN NOT EXISTS (SELECT 1 FROM {PAUSE_TABLE})"
+    new_values = _facet_values_sql("new")
+    old_values = _facet_values_sql("old")
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {FACETS_TABLE} (
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (facet, value)
+        )""",
+        # Triggers are recreated every time so their definition tracks this file
+        f"DROP TRIGGER IF EXISTS {FACETS_TABLE}_ai",
+        f"DROP TRIGGER IF EXISTS {FACETS_TABLE}_ad",
+        f"DROP TRIGGER IF EXISTS {FACETS_TABLE}_au",
+        f"""CREATE TRIGGER {FACETS_TABLE}_ai AFTER INSERT ON books {active} BEGIN
+            {_add_sql(new_values)}
+        END""",
+        f"""CREATE TRIGGER {FACETS_TABLE}_ad AFTER DELETE ON books {active} BEGIN
+            {_remove_sql(old_values)}
+        END""",
+        f"""CREATE TRIGGER {FACETS_TABLE}_au AFTER UPDATE OF {columns} ON books {active} BEGIN
+            {_remove_sql(old_values)}
+            {_add_sql(new_values)}
+        END""",
+    ]
+
+
+def ensure_facets(engine: Engine):
+    # Idempotent: creates the aggregate table and triggers if missing and
+    # fills it from existing rows the first time.
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FACETS_TABLE},
+        ).first()
+        for statement in _facets_ddl():
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FACETS_TABLE} (facet, value, count) {_facet_counts_sql()}"))
+
+
+def begin_bulk_facets(db: Session, isbns: List[str]):
+    # Call inside the bulk transaction (triggers paused), before writing the rows for `isbns`
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    # Take out the rows about to be overwritten
+    db.execute(
+        text(f"""UPDATE {FACETS_TABLE} SET count = count - f.n
+            FROM ({_facet_counts_sql("WHERE b.isbn IN :isbns")}) AS f
+            WHERE {FACETS_TABLE}.facet = f.facet AND {FACETS_TABLE}.value = f.value""")
+        .bindparams(bindparam("isbns", expanding=True)),
+        {"isbns": isbns},
+    )
+
+
+def end_bulk_facets(db: Session, isbns: List[str]):
+    # Call after writing the rows, before the triggers are resumed
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(
+        text(f"""INSERT INTO {FACETS_TABLE} (facet, value, count)
+            SELECT facet, value, n FROM ({_facet_counts_sql("WHERE b.isbn IN :isbns")}) WHERE true
+            ON CONFLICT (facet, value) DO UPDATE SET count = count + excluded.count""")
+        .bindparams(bindparam("isbns", expanding=True)),
+        {"isbns": isbns},
+    )
+
+
+def _bucket_expression(column, bounds):
+    whens = [(column < bounds[i + 1], bucket_label(bounds, i)) for i in range(len(bounds) - 1)]
+    return case(*whens, else_=bucket_label(bounds, len(bounds) - 1))
+
+
+def _count_rows(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        return db.execute(text(f"SELECT facet, value, count FROM {FACETS_TABLE} WHERE count > 0")).all()
+
+    # No aggregate table: GROUP BY each facet
+    selects = [
+        select(literal(name).label("facet"), getattr(Book, name).label("value"), func.count().label("count"))
+        .where(getattr(Book, name).isnot(None)).group_by(getattr(Book, name))
+        for name in CATEGORY_FACETS
+    ]
+    for name, bounds in BUCKETS.items():
+        bucket = _bucket_expression(getattr(Book, name), bounds)
+        selects.append(
+            select(literal(name).label("facet"), bucket.label("value"), func.count().label("count"))
+            .where(getattr(Book, name).isnot(None)).group_by(bucket)
+        )
+    return db.execute(union_all(*selects)).all()
+
+
+def get_facets(db: Session) -> dict:
+    counts = {name: {} for name in CATEGORY_FACETS + tuple(BUCKETS)}
+    for facet, value, count in _count_rows(db):
+        if facet in counts:
+            counts[facet][value] = count
+
+    result = {
+        # Most common first
+        name: [{"value": value, "count": count} for value, count in sorted(counts[name].items(), key=lambda item: (-item[1], item[0]))]
+        for name in CATEGORY_FACETS
+    }
+    for name, bounds in BUCKETS.items():
+        # Every bucket, in order, including empty ones
+        result[name] = [
+            {
+                "bucket": bucket_label(bounds, i),
+                "min": bounds[i],
+                "max": bounds[i + 1] if i + 1 < len(bounds) else None,
+                "count": counts[name].get(bucket_label(bounds, i), 0),
+            }
+            for i in range(len(bounds))
+        ]
+    return result
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from core import config
+from core.metrics import jobs_finished
+from db.session import session_scope
+from models.job import Job
+
+
+# Persistent background jobs, run by worker tasks inside the app process.
+# A job is a row in `jobs`, added in the same transaction as the change that
+# needs it, so it exists exactly when that change committed. Workers claim due
+# jobs with a lease: if a worker dies (or the app restarts) mid-job, the job is
+# claimed again once JOB_LEASE_SECONDS have passed, by any process. Delivery is
+# therefore at least once and handlers must tolerate seeing a job twice.
+#
+# Handlers get a batch of jobs of one kind and return {job id: result}:
+#   - a plain function fn(session, jobs) runs through Database.run and commits
+#     together with the jobs being marked done (database work)
+#   - an async function fn(jobs) runs on the event loop (I/O, e.g. sending mail)
+# A result that is an Exception fails just that job; a raised exception fails
+# the batch, which is then retried one job at a time to isolate the bad one.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs older than JOB_RETENTION_HOURS are purged this often
+PURGE_INTERVAL_SECONDS = 600
+
+logger = logging.getLogger("bookhub.jobs")
+
+handlers: Dict[str, Callable] = {}
+
+
+def handler(kind: str):
+    # Decorator registering the handler for a job kind
+    def register(fn):
+        handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db: Session, kind: str, payload: dict) -> Job:
+    # Adds a job to the caller's transaction (the id is assigned right away);
+    # call job_queue.wake() once it has committed
+    job = Job(kind=kind, payload=payload, status=QUEUED, attempts=0, run_after=datetime.utcnow())
+    db.add(job)
+    db.flush()
+    return job
+
+
+# --- Database side (sync, run through Database.run) ---
+def _claimable(jobs, now: datetime):
+    return or_(
+        and_(jobs.c.status == QUEUED, jobs.c.run_after <= now),
+        # Lease ran out: whoever held it is gone
+        and_(jobs.c.status == RUNNING, jobs.c.locked_until < now),
+    )
+
+
+def _claim(db: Session, limit: int):
+    jobs = Job.__table__
+    now = datetime.utcnow()
+
+    # Read-only check first, so idle polling never takes the write lock
+    if db.execute(select(jobs.c.id).where(_claimable(jobs, now)).limit(1)).first() is None:
+        db.rollback()
+        return []
+    db.rollback()
+
+    ids = select(jobs.c.id).where(_claimable(jobs, now)).order_by(jobs.c.id).limit(limit)
+    rows = db.execute(
+        update(jobs)
+        # Re-checked on the row itself: another worker may have claimed it meanwhile
+        .where(jobs.c.id.in_(ids), _claimable(jobs, now))
+        .values(
+            status=RUNNING,
+            attempts=jobs.c.attempts + 1,
+            locked_until=now + timedelta(seconds=config.JOB_LEASE_SECONDS),
+            updated_at=now,
+        )
+        .returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts)
+    ).all()
+    db.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def _record(db: Session, jobs: list, results: dict):
+    table = Job.__table__
+    now = datetime.utcnow()
+    for job in jobs:
+        result = results.get(job.id)
+        if isinstance(result, Exception):
+            _record_failure(db, job, result, now)
+            continue
+        db.execute(
+            update(table).where(table.c.id == job.id)
+            .values(status=DONE, result=result, error=None, locked_until=None, updated_at=now)
+        )
+        jobs_finished.inc(job.kind, DONE)
+    db.commit()
+
+
+def _record_failure(db: Session, job, error: Exception, now: datetime):
+    table = Job.__table__
+    message = f"{type(error).__name__}: {error}"
+    if job.attempts >= config.JOB_MAX_ATTEMPTS:
+        values = {"status": FAILED}
+        outcome = FAILED
+    else:
+        # Exponential backoff: 2s, 4s, 8s ... capped at 5 minutes
+        values = {"status": QUEUED, "run_after": now + timedelta(seconds=min(2 ** job.attempts, 300))}
+        outcome = "retry"
+    db.execute(
+        update(table).where(table.c.id == job.id)
+        .values(error=message, locked_until=None, updated_at=now, **values)
+    )
+    jobs_finished.inc(job.kind, outcome)
+
+
+def _run_sync_handler(db: Session, fn, jobs: list):
+    # The handler's changes and the jobs' completion commit together
+    try:
+        results = fn(db, jobs)
+    except Exception:
+        db.rollback()
+        raise
+    _record(db, jobs, results or {})
+
+
+def _fail(db: Session, job, error: Exception):
+    _record_failure(db, job, error, datetime.utcnow())
+    db.commit()
+
+
+def _purge(db: Session, before: datetime):
+    jobs = Job.__table__
+    db.execute(delete(jobs).where(jobs.c.status == DONE, jobs.c.updated_at < before))
+    db.commit()
+
+
+# --- Workers ---
+class JobQueue:
+    def __init__(self):
+        self._wakeup = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._next_purge = 0.0
+
+    def wake(self):
+        # New work was committed: skip the rest of the idle poll
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self, workers: int = None):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(workers or config.JOB_WORKERS)]
+
+    async def stop(self, timeout: float = 10):
+        # Lets running batches finish; anything cut off is re-claimed after its lease
+        self._stopping = True
+        self.wake()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _worker(self, number: int):
+        while not self._stopping:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("job worker %s failed", number)
+                processed = 0
+            if not processed and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=config.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self, limit: int = None) -> int:
+        # Claims and runs one batch; returns how many jobs it took
+        if self._wakeup is not None:
+            self._wakeup.clear()
+        async with session_scope() as db:
+            claimed = await db.run(_claim, limit or config.JOB_BATCH_SIZE)
+            by_kind = {}
+            for job in claimed:
+                by_kind.setdefault(job.kind, []).append(job)
+            for kind, jobs in by_kind.items():
+                await self._run_batch(db, kind, jobs)
+
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+                await db.run(_purge, datetime.utcnow() - timedelta(hours=config.JOB_RETENTION_HOURS))
+        return len(claimed)
+
+    async def _run_batch(self, db, kind: str, jobs: list):
+        fn = handlers.get(kind)
+        try:
+            if fn is None:
+                raise LookupError(f"no handler for job kind {kind!r}")
+            if asyncio.iscoroutinefunction(fn):
+                results = await fn(jobs)
+                await db.run(_record, jobs, results or {})
+            else:
+                await db.run(_run_sync_handler, fn, jobs)
+        except Exception as exc:
+            if len(jobs) > 1:
+                for job in jobs:
+                    await self._run_batch(db, kind, [job])
+                return
+            logger.exception("job %s (%s) failed on attempt %s", jobs[0].id, kind, jobs[0].attempts)
+            await db.run(_fail, jobs[0], exc)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,346 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core import config
+
+
+# In-process metrics, exposed in the Prometheus text format on GET /metrics.
+#   - MetricsMiddleware: request count/latency per route, plus the SQL queries
+#     and database time each request caused (a high count per request is an N+1)
+#   - instrument_engine: SQL query timing and the slow-query log
+#   - TimedQueuePool: connection pool checkouts and the time spent waiting for one
+#   - register_cache: hit/miss/eviction counters of a core.cache.Cache
+#   - jobs_finished: background job outcomes (core/jobs.py)
+#   - requests_rejected: requests turned away by core/ratelimit.py
+#   - startup_seconds: time spent in each startup phase (main.py lifespan)
+#   - flights_started / flights_coalesced: cache-miss reads run vs. joined (core/singleflight.py)
+# Each worker process keeps its own numbers; scrape every worker.
+
+logger = logging.getLogger("bookhub.slow_query")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels + ("le",), label_values + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total!r}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class DecayingAverage:
+    # Moving average of recent samples that also fades towards 0 while no samples
+    # arrive, so it reflects the last few seconds rather than the last sample
+    def __init__(self, half_life: float, weight: float = 0.2):
+        self.half_life = half_life
+        self.weight = weight
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def observe(self, sample: float):
+        with self._lock:
+            now = time.monotonic()
+            value = self._decayed(now)
+            self._value = value + self.weight * (sample - value)
+            self._updated = now
+
+    def value(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Called at scrape time; each returns (name, type, help, [(labels dict, value)])
+        self.collectors: List[Callable[[], List[tuple]]] = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+
+        # Several collectors may report the same family (e.g. two caches): group them
+        families = {}
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                families.setdefault(name, (kind, help_text, []))[2].extend(samples)
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                names = tuple(labels)
+                lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "bookhub_http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "bookhub_http_request_duration_seconds", "Time to the end of the response body.", ("method", "route"))
+request_queries = registry.histogram(
+    "bookhub_http_request_db_queries", "SQL statements executed per request.", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS)
+request_db_time = registry.histogram(
+    "bookhub_http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route"))
+db_queries = registry.histogram(
+    "bookhub_db_query_duration_seconds", "SQL statement execution time.", ("operation",))
+slow_queries = registry.counter(
+    "bookhub_db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("operation",))
+pool_checkouts = registry.counter(
+    "bookhub_db_pool_checkouts_total", "Connections checked out of the pool.", ("pool",))
+pool_wait = registry.histogram(
+    "bookhub_db_pool_wait_seconds", "Time spent waiting for a pooled connection (including opening one).", ("pool",))
+pool_timeouts = registry.counter(
+    "bookhub_db_pool_timeouts_total", "Pool checkouts that gave up after DB_POOL_TIMEOUT.", ("pool",))
+jobs_finished = registry.counter(
+    "bookhub_jobs_total", "Background jobs finished, by outcome (done, retry, failed).", ("kind", "outcome"))
+flights_started = registry.counter(
+    "bookhub_singleflight_started_total", "Reads that ran (cache misses with no identical read in flight).", ("flight",))
+flights_coalesced = registry.counter(
+    "bookhub_singleflight_coalesced_total", "Requests that shared an identical read already in flight.", ("flight",))
+requests_rejected = registry.counter(
+    "bookhub_http_rejected_total", "Requests refused before reaching a route (rate_limit, concurrency, pool_wait).", ("reason",))
+
+# Pool wait over the last seconds, across pools: admission control sheds load on it
+recent_pool_wait = DecayingAverage(half_life=1.0)
+
+# Phase -> seconds, filled in once by the lifespan handler
+startup_seconds: Dict[str, float] = {}
+registry.collectors.append(lambda: [
+    ("bookhub_startup_seconds", "gauge", "Time spent in each startup phase of this worker.",
+     [({"phase": phase}, seconds) for phase, seconds in startup_seconds.items()]),
+] if startup_seconds else [])
+
+
+# --- Per-request accounting ---
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by the middleware; visible in the threadpool and in the greenlets running async sessions
+_current: ContextVar[Optional[RequestStats]] = ContextVar("bookhub_request_stats", default=None)
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware task hop on every request)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if config.SERVER_TIMING:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    header = (
+                        f'app;dur={elapsed_ms:.1f}, '
+                        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                    )
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # Route template, not the raw path, so ids don't explode the label set
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route_label, status_code)
+            http_latency.observe(time.perf_counter() - started, method, route_label)
+            request_queries.observe(stats.queries, method, route_label)
+            request_db_time.observe(stats.db_seconds, method, route_label)
+
+
+# --- SQL timing ---
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_queries.observe(elapsed, operation)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+    if config.SLOW_QUERY_MS and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        slow_queries.inc(operation)
+        logger.warning("slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    pool = sync_engine.pool
+    label = type(pool).__name__
+    event.listen(pool, "checkout", lambda *args: pool_checkouts.inc(label))
+    registry.collectors.append(lambda: _pool_samples(pool, label))
+    return sync_engine
+
+
+def _pool_samples(pool, label: str):
+    if not hasattr(pool, "checkedout"):
+        return []
+    return [
+        ("bookhub_db_pool_checked_out", "gauge", "Connections currently checked out.", [({"pool": label}, pool.checkedout())]),
+        ("bookhub_db_pool_size", "gauge", "Configured pool size.", [({"pool": label}, pool.size())]),
+    ]
+
+
+# --- Pool wait ---
+class _TimedConnect:
+    # Times Pool.connect(), the public entry point every engine checkout goes
+    # through: waiting for a free connection, plus opening or pre-pinging one
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_timeouts.inc(type(self).__name__)
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_wait.observe(waited, type(self).__name__)
+            recent_pool_wait.observe(waited)
+
+
+class TimedQueuePool(_TimedConnect, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedConnect, AsyncAdaptedQueuePool):
+    pass
+
+
+# --- Caches ---
+def register_cache(name: str, cache):
+    def collect():
+        stats = cache.stats.as_dict()
+        samples = []
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            samples.append((f"bookhub_cache_{key}_total", "counter", f"Cache {key}.", [({"cache": name}, stats[key])]))
+        samples.append(("bookhub_cache_hit_ratio", "gauge", "Hits / lookups since start.", [({"cache": name}, stats["hit_ratio"])]))
+        return samples
+
+    registry.collectors.append(collect)
@@ -0,0 +1,53 @@
+import importlib
+import json
+import logging
+import threading
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from core import config
+
+
+# Outgoing notifications (service-request updates to the contact_email).
+# There is no mail server in this project, so the built-in senders are local
+# stand-ins. A real sender only needs `async send(to, subject, body)`; set
+# NOTIFIER=package.module:attribute to a class (created with no arguments) or
+# factory returning one. Sending runs in the background jobs (core/jobs.py),
+# never inside a request.
+
+logger = logging.getLogger("bookhub.notify")
+
+
+class LogNotifier:
+    async def send(self, to: str, subject: str, body: str):
+        logger.info("to=%s subject=%s\n%s", to, subject, body)
+
+
+class OutboxNotifier:
+    # One JSON line per message, a mail spool that tests and dev tools can read
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, line: str):
+        with self._lock, open(self.path, "a", encoding="utf-8") as outbox:
+            outbox.write(line + "\n")
+
+    async def send(self, to: str, subject: str, body: str):
+        line = json.dumps({"to": to, "subject": subject, "body": body, "sent_at": datetime.utcnow().isoformat()})
+        await run_in_threadpool(self._append, line)
+
+
+def create_notifier():
+    if config.NOTIFIER == "log":
+        return LogNotifier()
+    if config.NOTIFIER == "outbox":
+        return OutboxNotifier(config.NOTIFY_OUTBOX_PATH)
+    module_name, _, attribute = config.NOTIFIER.partition(":")
+    if not attribute:
+        raise ValueError(f"NOTIFIER must be log, outbox or package.module:attribute, got {config.NOTIFIER!r}")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+notifier = create_notifier()
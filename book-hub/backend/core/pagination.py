@@ -0,0 +1,91 @@
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_
+
+from core.totals import split_total, total_subquery
+
+
+# Keyset ("cursor") pagination.
+# A cursor is an opaque, URL-safe token holding the (sort_key, id) of the last
+# row of the previous page, so the next page is a range seek on an index
+# instead of an OFFSET that walks and discards every skipped row.
+
+
+def encode_cursor(sort_key: str, sort_value: Any, row_id: int) -> str:
+    raw = json.dumps({"k": sort_key, "v": sort_value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["k"] != sort_key:
+            raise ValueError("cursor was issued for a different sort order")
+        return data["v"], int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def apply_keyset(query, sort_column, id_column, cursor: Optional[str], sort_key: str, descending: bool = False):
+    # Order by (sort_column, id) and, if a cursor is given, seek past it.
+    # Rows with a NULL sort value never match the seek, so callers filter them out.
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_key)
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            # Written as a range plus a tie-break so the planner can seek the (sort_column, id) index
+            query = query.filter(
+                sort_column <= sort_value,
+                or_(sort_column < sort_value, id_column < last_id),
+            )
+        else:
+            query = query.filter(
+                sort_column >= sort_value,
+                or_(sort_column > sort_value, id_column > last_id),
+            )
+
+    if sort_column is id_column:
+        return query.order_by(id_column.desc() if descending else id_column)
+    if descending:
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column, id_column)
+
+
+def paginate(query, skip: int, limit: int):
+    # Fetch one extra row to learn whether another page exists without a second query
+    rows = query.offset(skip).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def fetch_page(filtered, ordered, skip: int, limit: int, count: str, estimate=None, cursor: Optional[str] = None):
+    # `filtered` is the query before ordering/keyset seeking (used for the total),
+    # `ordered` is what the page is read from. Returns (rows, has_more, total).
+    if count == "none":
+        rows, has_more = paginate(ordered, skip, limit)
+        return rows, has_more, None
+
+    if count == "estimate" and estimate is not None:
+        rows, has_more = paginate(ordered, skip, limit)
+        return rows, has_more, estimate()
+
+    rows, has_more = paginate(ordered.add_columns(total_subquery(filtered)), skip, limit)
+    rows, total = split_total(rows)
+    if total is None:
+        # Empty page: nothing carried the total, so count only if we are past the start
+        total = filtered.count() if (skip or cursor) else 0
+    return rows, has_more, total
+
+
+def next_cursor_for(rows, has_more: bool, sort_key: str, sort_attr: str = "id") -> Optional[str]:
+    if not has_more or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort_key, getattr(last, sort_attr), last.id)
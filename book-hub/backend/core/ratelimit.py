@@ -0,0 +1,252 @@
+import importlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from core import config
+from core.metrics import recent_pool_wait, registry, requests_rejected
+from core.security import verify_access_token
+
+
+# Rate limiting and admission control, in front of every route.
+#   - Per client: a token bucket (RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST).
+#     Expensive routes cost more tokens (RATE_LIMIT_COSTS), so a client doing
+#     title scans or sign-ins runs dry long before one browsing the catalog.
+#     Over the limit: 429 with Retry-After.
+#   - For everyone: past MAX_CONCURRENT_REQUESTS in flight, or while database
+#     connections are slow to come by (SHED_POOL_WAIT_MS), new requests are
+#     turned away with 503 and Retry-After. Answering fast keeps the requests
+#     already admitted fast, instead of everybody timing out together.
+# Bucket stores have one method, take(key, cost, rate, burst) -> seconds to wait
+# (0 means the tokens were taken). It is called in the threadpool, since it may
+# wait on the network, unless the store sets `blocking = False`.
+
+
+# --- Cost rules ---
+class CostRule:
+    def __init__(self, method: str, path: str, param: Optional[str], cost: float):
+        self.method = method
+        self.prefix = path.endswith("*")
+        self.path = path.rstrip("*") if self.prefix else path
+        self.param = param
+        self.cost = cost
+
+    def matches(self, method: str, path: str, query: str) -> bool:
+        if self.method != "*" and self.method != method:
+            return False
+        if not (path.startswith(self.path) if self.prefix else path == self.path):
+            return False
+        if self.param is None:
+            return True
+        # Presence of a non-empty ?param=, without parsing the whole query string
+        return any(
+            part.partition("=")[0] == self.param and part.partition("=")[2]
+            for part in query.split("&")
+        )
+
+
+def parse_costs(spec: str) -> List[CostRule]:
+    rules = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        target, _, cost = item.rpartition("=")
+        method, _, path = target.strip().partition(" ")
+        path, _, param = path.strip().partition("?")
+        if not method or not path or not cost:
+            raise ValueError(f"RATE_LIMIT_COSTS entries look like 'GET /books/?title=5', got {item!r}")
+        rules.append(CostRule(method.upper(), path, param or None, float(cost)))
+    return rules
+
+
+# --- Bucket stores ---
+class MemoryBucketStore:
+    # Per process; the least recently seen clients are dropped past max_keys
+    # (a dropped bucket comes back full, which only ever errs towards allowing)
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                wait = 0.0
+            else:
+                bucket[0] = tokens
+                wait = (cost - tokens) / rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Refill and take in one atomic step on the server, on the server's clock
+_REDIS_TAKE = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    # Shared by every worker and host
+    def __init__(self, url: str, prefix: str = "bookhub:rate"):
+        import redis  # optional dependency, only needed for RATE_LIMIT_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_REDIS_TAKE)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        return float(self._take(keys=[f"{self.prefix}:{key}"], args=[rate, burst, cost]))
+
+
+def create_store():
+    if config.RATE_LIMIT_BACKEND == "memory":
+        return MemoryBucketStore(config.RATE_LIMIT_MAX_CLIENTS)
+    if config.RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore(config.RATE_LIMIT_URL)
+    module_name, _, attribute = config.RATE_LIMIT_BACKEND.partition(":")
+    if not attribute:
+        raise ValueError(
+            f"RATE_LIMIT_BACKEND must be memory, redis or package.module:attribute, got {config.RATE_LIMIT_BACKEND!r}"
+        )
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+# --- Rate limiter ---
+class RateLimiter:
+    def __init__(self, store, rate: float, burst: float, rules: List[CostRule]):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.rules = rules
+
+    def cost(self, method: str, path: str, query: str) -> float:
+        for rule in self.rules:
+            if rule.matches(method, path, query):
+                # Never more than a full bucket, or the request could never pass
+                return min(rule.cost, self.burst)
+        return 1.0
+
+    def client_key(self, scope) -> str:
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization", "")
+        if authorization[:7].lower() == "bearer ":
+            try:
+                claims = verify_access_token(authorization[7:].strip())
+                return f"user:{claims.get('uid') or claims['sub']}"
+            except Exception:
+                # Bad token: the route will say so, the address pays for it
+                pass
+        if config.RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                return f"ip:{forwarded.split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def check(self, scope) -> float:
+        # Seconds until the request would be allowed; 0 if it is (and was charged)
+        query = scope.get("query_string", b"").decode("latin-1")
+        cost = self.cost(scope["method"], scope["path"], query)
+        key = self.client_key(scope)
+        if getattr(self.store, "blocking", True):
+            # A Redis round trip must not hold up the event loop
+            return await run_in_threadpool(self.store.take, key, cost, self.rate, self.burst)
+        return self.store.take(key, cost, self.rate, self.burst)
+
+
+def create_limiter() -> Optional[RateLimiter]:
+    if not config.RATE_LIMIT_ENABLED:
+        return None
+    return RateLimiter(
+        create_store(), config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST, parse_costs(config.RATE_LIMIT_COSTS)
+    )
+
+
+# --- Middleware ---
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    # Plain ASGI middleware, like MetricsMiddleware; sits inside CORS so that
+    # browsers can read the 429/503 responses
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter if limiter is not None else create_limiter()
+        self.exempt = {path.strip() for path in config.ADMISSION_EXEMPT_PATHS.split(",") if path.strip()}
+        # Only touched from the event loop, so a plain counter is enough
+        self.in_flight = 0
+        registry.collectors.append(self._samples)
+
+    def _samples(self) -> List[tuple]:
+        return [("bookhub_http_in_flight", "gauge", "Requests being handled.", [({}, self.in_flight)])]
+
+    def _shed(self) -> Optional[Tuple[str, str]]:
+        if config.MAX_CONCURRENT_REQUESTS and self.in_flight >= config.MAX_CONCURRENT_REQUESTS:
+            return "concurrency", "Server is busy, please retry shortly"
+        if config.SHED_POOL_WAIT_MS and recent_pool_wait.value() * 1000 > config.SHED_POOL_WAIT_MS:
+            return "pool_wait", "Database is overloaded, please retry shortly"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        shed = self._shed()
+        if shed is not None:
+            reason, detail = shed
+            requests_rejected.inc(reason)
+            await _reject(503, detail, 1)(scope, receive, send)
+            return
+
+        if self.limiter is not None:
+            wait = await self.limiter.check(scope)
+            if wait > 0:
+                requests_rejected.inc("rate_limit")
+                await _reject(429, "Too many requests, please slow down", wait)(scope, receive, send)
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
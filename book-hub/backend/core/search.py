@@ -0,0 +1,139 @@
+import re
+from typing import List
+
+from sqlalchemy import bindparam, column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.book import Book
+
+
+# Full-text search over the catalog.
+# On SQLite this is an external-content FTS5 table over the searchable book
+# columns, kept in sync with `books` by triggers (so every insert/update/delete
+# path, including raw SQL, updates the index). Other databases fall back to ILIKE.
+#
+# Bulk loads pause the triggers for their own transaction (a row in
+# index_sync_paused that is never committed, so no other connection sees it)
+# and index each batch set-based, which is several times faster than per row.
+
+FTS_TABLE = "books_fts"
+PAUSE_TABLE = "index_sync_paused"
+FTS_COLUMNS = ("title", "author", "description", "publisher")
+
+# bm25 weights, same order as FTS_COLUMNS: title matches rank highest
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+
+books_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_ddl():
+    cols = ", ".join(FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    active = f"WHEN NOT EXISTS (SELECT 1 FROM {PAUSE_TABLE})"
+    return [
+        f"CREATE TABLE IF NOT EXISTS {PAUSE_TABLE} (id INTEGER PRIMARY KEY)",
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {cols},
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )""",
+        # Triggers are recreated every time so their definition tracks this file
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+        f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON books {active} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END""",
+        f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON books {active} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END""",
+        f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {cols} ON books {active} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END""",
+    ]
+
+
+def ensure_search_index(engine: Engine):
+    # Idempotent: creates the FTS table and triggers if missing and
+    # backfills it from existing rows the first time.
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for statement in _fts_ddl():
+            conn.execute(text(statement))
+
+        weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', :rank)"),
+            {"rank": f"bm25({weights})"},
+        )
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def begin_bulk_sync(db: Session, isbns: List[str]):
+    # Call inside the bulk transaction, before writing the rows for `isbns`
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(text(f"INSERT INTO {PAUSE_TABLE} (id) VALUES (1)"))
+    # Drop index entries of rows about to be overwritten (needs their current values)
+    db.execute(
+        text(f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {", ".join(FTS_COLUMNS)})
+            SELECT 'delete', id, {", ".join(FTS_COLUMNS)} FROM books WHERE isbn IN :isbns""")
+        .bindparams(bindparam("isbns", expanding=True)),
+        {"isbns": isbns},
+    )
+
+
+def end_bulk_sync(db: Session, isbns: List[str]):
+    # Call after writing the rows, before commit
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(
+        text(f"""INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+            SELECT id, {", ".join(FTS_COLUMNS)} FROM books WHERE isbn IN :isbns""")
+        .bindparams(bindparam("isbns", expanding=True)),
+        {"isbns": isbns},
+    )
+    db.execute(text(f"DELETE FROM {PAUSE_TABLE}"))
+
+
+def to_match_expression(q: str) -> str:
+    # "harry pot" -> '"harry"* "pot"*' (every term must match, as a prefix)
+    tokens = _TOKEN_RE.findall(q)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query, q: str, dialect_name: str):
+    # Restrict a Book query to rows matching `q`, ordered by relevance.
+    match = to_match_expression(q)
+    if not match:
+        return query
+
+    if dialect_name == "sqlite":
+        return (
+            query.join(books_fts, books_fts.c.rowid == Book.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+            .order_by(books_fts.c.rank)
+        )
+
+    terms = [f"%{token}%" for token in _TOKEN_RE.findall(q)]
+    for term in terms:
+        query = query.filter(or_(
+            Book.title.ilike(term),
+            Book.author.ilike(term),
+            Book.description.ilike(term),
+            Book.publisher.ilike(term),
+        ))
+    return query.order_by(func.lower(Book.title))
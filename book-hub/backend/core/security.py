@@ -1,9 +1,11 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
-
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from core import config
+from core.cache import Cache, CacheStats, MemoryBackend
 
 
 # secret key - in prod keep this secure (env var or secrets manager)
@@ -12,28 +14,115 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt and python-jose (with its crypto backends) are imported on first use:
+# they add to every worker's boot time and many requests never touch them.
+
+# --- Password hashing (bcrypt) ---
+# bcrypt only looks at the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds or config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8")[:BCRYPT_MAX_BYTES], salt).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    import bcrypt
+
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8")[:BCRYPT_MAX_BYTES], hashed_password.encode("utf-8"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # "$2b$12$..." -> cost 12
+    try:
+        return int(hashed_password.split("$")[2]) != config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+class HashingBusy(Exception):
+    # Raised instead of queueing when the hashing pool is saturated
+    pass
+
 
+class PasswordHasher:
+    # Dedicated pool for bcrypt, so a burst of logins cannot take over the
+    # threadpool shared by every other endpoint. bcrypt releases the GIL, so
+    # threads hash in parallel. At most `workers + max_queued` hashes are
+    # accepted at once; beyond that callers get HashingBusy straight away.
+    def __init__(self, workers: int, max_queued: int):
+        self.max_pending = workers + max_queued
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    async def _run(self, fn, *args):
+        # Only touched from the event loop, so a plain counter is enough
+        if self._pending >= self.max_pending:
+            raise HashingBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_QUEUED)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise
\ No newline at end of file
+    from jose import jwt
+
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+# Verified tokens -> claims, per process. A token's signature and expiry never
+# change, so a cached entry stays valid until its own `exp`; invalid tokens are
+# never cached.
+_token_stats = CacheStats()
+token_cache = Cache(
+    MemoryBackend(config.TOKEN_CACHE_MAX_ENTRIES, _token_stats),
+    _token_stats,
+    prefix="token",
+    default_ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def verify_access_token(token: str) -> dict:
+    # Same as decode_access_token, but skips the signature check for tokens seen before
+    key = token_cache.key("claims", token)
+    claims = token_cache.get(key)
+    if claims is not None:
+        if claims.get("exp", float("inf")) > time.time():
+            return claims
+        from jose import JWTError
+
+        raise JWTError("Signature has expired.")
+
+    claims = decode_access_token(token)
+    ttl = claims["exp"] - time.time() if "exp" in claims else None
+    if ttl is None or ttl > 0:
+        token_cache.set(key, claims, ttl)
+    return claims
\ No newline at end of file
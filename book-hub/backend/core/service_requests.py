@@ -0,0 +1,100 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.jobs import enqueue, handler
+from core.notify import notifier
+from models.book import Book, ServiceRequest
+
+
+# Background processing of service requests (jobs, see core/jobs.py):
+#   - CREATED: look the requested title up in the catalog (one query per batch,
+#     on the lower(title) index) and acknowledge the request to its contact
+#   - STATUS: apply a status change and tell the contact
+#   - NOTIFY: deliver one message through the configured notifier
+# Messages are queued as NOTIFY jobs in the same transaction as the change they
+# describe, so a rolled back change never sends mail.
+
+CREATED = "service_request.created"
+STATUS = "service_request.status"
+NOTIFY = "notify"
+
+
+def _notify(db: Session, to: str, subject: str, body: str):
+    if to:
+        enqueue(db, NOTIFY, {"to": to, "subject": subject, "body": body})
+
+
+def _load_requests(db: Session, jobs) -> dict:
+    ids = {job.payload["service_request_id"] for job in jobs}
+    return {sr.id: sr for sr in db.query(ServiceRequest).filter(ServiceRequest.id.in_(ids))}
+
+
+@handler(CREATED)
+def match_titles(db: Session, jobs) -> dict:
+    requests = _load_requests(db, jobs)
+
+    # Every title in the batch in one lookup; same-title books are told apart by author
+    titles = {sr.title.strip().lower() for sr in requests.values() if sr.title}
+    candidates = {}
+    if titles:
+        rows = (
+            db.query(Book.id, Book.title, Book.author)
+            .filter(func.lower(Book.title).in_(titles))
+            .order_by(Book.id)
+        )
+        for book_id, title, author in rows:
+            candidates.setdefault(title.strip().lower(), []).append((book_id, (author or "").strip().lower()))
+
+    results = {}
+    for job in jobs:
+        sr = requests.get(job.payload["service_request_id"])
+        if sr is None:
+            # Deleted before we got to it
+            results[job.id] = {"service_request_id": job.payload["service_request_id"], "skipped": True}
+            continue
+
+        books = candidates.get((sr.title or "").strip().lower(), [])
+        author = (sr.author or "").strip().lower()
+        match = next((book_id for book_id, book_author in books if book_author == author), None)
+        if match is None and books:
+            match = books[0][0]
+        sr.matched_book_id = match
+
+        if match is not None:
+            body = f'Good news: "{sr.title}" is already in our catalog (book #{match}).'
+        else:
+            body = f'We are looking for "{sr.title}" by {sr.author} and will let you know.'
+        _notify(db, sr.contact_email, f'We received your request for "{sr.title}"', body)
+        results[job.id] = {"service_request_id": sr.id, "matched_book_id": match}
+    return results
+
+
+@handler(STATUS)
+def apply_status(db: Session, jobs) -> dict:
+    requests = _load_requests(db, jobs)
+    results = {}
+    # Jobs come in id order, so the latest change to a request wins
+    for job in jobs:
+        sr = requests.get(job.payload["service_request_id"])
+        status = job.payload["status"]
+        if sr is None:
+            results[job.id] = {"service_request_id": job.payload["service_request_id"], "skipped": True}
+            continue
+        if sr.status != status:
+            sr.status = status
+            _notify(db, sr.contact_email, f'Your request for "{sr.title}" is now {status}', f"New status: {status}.")
+        results[job.id] = {"service_request_id": sr.id, "status": status}
+    return results
+
+
+@handler(NOTIFY)
+async def send_notifications(jobs) -> dict:
+    results = {}
+    for job in jobs:
+        try:
+            await notifier.send(job.payload["to"], job.payload["subject"], job.payload["body"])
+            results[job.id] = {"to": job.payload["to"]}
+        except Exception as exc:
+            # Only this message is retried; the rest of the batch was sent
+            results[job.id] = exc
+    return results
@@ -0,0 +1,478 @@
+import importlib.util
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within one process
+    fcntl = None
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core import config
+from core.jobs import QUEUED, enqueue, handler
+from db.session import SessionLocal
+from models.book import Book
+from models.job import Job
+
+
+# "Similar books" (GET /books/{id}/similar). Every book is a feature vector:
+#   - title + description: TF-IDF, hashed into SIMILAR_TEXT_DIM signed buckets
+#   - genre, language, author: one-hot, hashed into small blocks
+#   - price (log scale) and rating: an angle each, so the dot product of two
+#     books falls off with the difference
+# Each part is unit length times its weight and the whole vector is normalised,
+# so a dot product is a cosine similarity.
+#
+# The top SIMILAR_TOP_K neighbours of every book are precomputed with blocked
+# matrix products and stored, with the vectors, as .npy files under SIMILAR_DIR
+# that every worker memory-maps (one copy in the OS page cache per host).
+# Answering a request is reading one row. Rows are indexed by book id.
+# Created/updated/deleted books are folded in by "similar.sync" jobs: one product
+# of the changed vectors against the matrix updates their own neighbours and
+# every list they now belong in (deleted books are just dropped, the gap closes
+# at the next rebuild). A rebuild writes a new directory and switches
+# SIMILAR_DIR/CURRENT to it atomically; readers follow within a second.
+# numpy is only imported when the index is used.
+
+NUMPY_INSTALLED = importlib.util.find_spec("numpy") is not None
+
+# Book columns the vectors are made from (changes to others don't need a sync)
+FEATURE_FIELDS = ("title", "description", "genre", "language", "author", "price", "rating")
+FEATURE_COLUMNS = (Book.id,) + tuple(getattr(Book, name) for name in FEATURE_FIELDS)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "the and for with that this from are was were his her its their they them into about "
+    "has have had but not all one who what when where which will would can more than".split()
+)
+# Document frequencies are counted per hash bucket
+IDF_BUCKETS = 1 << 18
+CATEGORY_BLOCKS = (("genre", 32), ("language", 16), ("author", 32))
+WEIGHTS = {"text": 1.0, "genre": 0.7, "author": 0.5, "language": 0.3, "price": 0.3, "rating": 0.3}
+PRICE_RANGE = (1.0, 200.0)
+RATING_RANGE = (0.0, 5.0)
+
+# Matrix product sizes: queries x rows per product (bounds memory per step)
+QUERY_BLOCK = 256
+ROW_BLOCK = 32768
+LOAD_BATCH = 5000
+
+CURRENT = "CURRENT"
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+# --- Features ---
+def _hash(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8"))
+
+
+def _tokens(book):
+    text = f"{book.title or ''} {book.description or ''}".lower()
+    return [token for token in TOKEN_RE.findall(text) if len(token) > 2 and token not in STOPWORDS]
+
+
+def dimension(text_dim: int) -> int:
+    return text_dim + sum(size for _, size in CATEGORY_BLOCKS) + 4
+
+
+def _angle(value, low: float, high: float, log: bool = False):
+    if value is None:
+        return None
+    if log:
+        value, low, high = math.log(max(value, low)), math.log(low), math.log(high)
+    return (min(max(value, low), high) - low) / (high - low) * math.pi / 2
+
+
+def _normalize(np, vector, weight: float = 1.0):
+    norm = float(np.sqrt(vector @ vector))
+    if norm:
+        vector *= weight / norm
+
+
+def featurize(np, books, idf, text_dim: int):
+    vectors = np.zeros((len(books), dimension(text_dim)), dtype=np.float32)
+    for vector, book in zip(vectors, books):
+        counts = {}
+        for token in _tokens(book):
+            counts[token] = counts.get(token, 0) + 1
+        text = vector[:text_dim]
+        for token, count in counts.items():
+            h = _hash(token)
+            weight = (1 + math.log(count)) * idf[h % IDF_BUCKETS]
+            # Signed hashing: colliding terms cancel out on average instead of adding up
+            text[h % text_dim] += weight if h & 0x80000000 else -weight
+        _normalize(np, text, WEIGHTS["text"])
+
+        offset = text_dim
+        for name, size in CATEGORY_BLOCKS:
+            value = getattr(book, name)
+            if value:
+                vector[offset + _hash(value.strip().lower()) % size] = WEIGHTS[name]
+            offset += size
+        for name, angle in (
+            ("price", _angle(book.price, *PRICE_RANGE, log=True)),
+            ("rating", _angle(book.rating, *RATING_RANGE)),
+        ):
+            if angle is not None:
+                vector[offset] = WEIGHTS[name] * math.cos(angle)
+                vector[offset + 1] = WEIGHTS[name] * math.sin(angle)
+            offset += 2
+        _normalize(np, vector)
+    return vectors
+
+
+# --- Top-k ---
+def _merge(np, best_ids, best_scores, scores, block_ids, k: int):
+    # Folds a block of scores (queries x block rows) into each query's running top k
+    if scores.shape[1] > k:
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    all_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+    all_ids = np.concatenate([best_ids, block_ids[top]], axis=1)
+    keep = np.argpartition(all_scores, -k, axis=1)[:, -k:]
+    return np.take_along_axis(all_ids, keep, axis=1), np.take_along_axis(all_scores, keep, axis=1)
+
+
+def _ranked(np, ids, scores):
+    # Best first; empty places are id -1
+    order = np.argsort(-scores, axis=1, kind="stable")
+    ids = np.take_along_axis(ids, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    ids[~np.isfinite(scores)] = -1
+    return ids.astype(np.int32), scores.astype(np.float32)
+
+
+def _empty_top_k(np, count: int, k: int):
+    return np.full((count, k), -1, dtype=np.int64), np.full((count, k), -np.inf, dtype=np.float32)
+
+
+# --- Storage ---
+class _Arrays:
+    # One build's files, memory-mapped
+    def __init__(self, np, path: str, mode: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as meta:
+            self.meta = json.load(meta)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        self.vectors = load("vectors")
+        self.neighbors = load("neighbors")
+        self.scores = load("scores")
+        self.present = load("present")
+        self.idf = np.load(os.path.join(path, "idf.npy"))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.present)
+
+    def flush(self):
+        for array in (self.vectors, self.neighbors, self.scores, self.present):
+            array.flush()
+
+
+def _create_arrays(np, path: str, capacity: int, idf, documents: int) -> _Arrays:
+    os.makedirs(path)
+    open_memmap = np.lib.format.open_memmap
+    text_dim, k = config.SIMILAR_TEXT_DIM, config.SIMILAR_TOP_K
+    # New files are sparse and read as zeros
+    open_memmap(os.path.join(path, "vectors.npy"), mode="w+", dtype=np.float32, shape=(capacity, dimension(text_dim))).flush()
+    open_memmap(os.path.join(path, "present.npy"), mode="w+", dtype=np.bool_, shape=(capacity,)).flush()
+    neighbors = open_memmap(os.path.join(path, "neighbors.npy"), mode="w+", dtype=np.int32, shape=(capacity, k))
+    neighbors[:] = -1
+    neighbors.flush()
+    scores = open_memmap(os.path.join(path, "scores.npy"), mode="w+", dtype=np.float32, shape=(capacity, k))
+    scores[:] = -np.inf
+    scores.flush()
+    np.save(os.path.join(path, "idf.npy"), idf)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as meta:
+        json.dump({"text_dim": text_dim, "k": k, "documents": documents}, meta)
+    return _Arrays(np, path, "r+")
+
+
+def _capacity(rows: int) -> int:
+    # Headroom so new books rarely force the files to be copied
+    return rows + max(1024, rows // 4)
+
+
+class SimilarIndex:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._reader = None
+        self._reader_path = None
+        self._checked = 0.0
+
+    # --- Reading ---
+    def _current_path(self):
+        try:
+            with open(os.path.join(self.root, CURRENT), encoding="utf-8") as current:
+                return os.path.join(self.root, current.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _arrays(self):
+        # Looks at CURRENT at most once a second, to pick up rebuilds from any process
+        now = time.monotonic()
+        if self._reader is None or now - self._checked >= 1.0:
+            self._checked = now
+            path = self._current_path()
+            if path is None:
+                self._reader, self._reader_path = None, None
+            elif path != self._reader_path:
+                try:
+                    self._reader, self._reader_path = _Arrays(_numpy(), path, "r"), path
+                except FileNotFoundError:
+                    # Replaced while we were opening it; the next call sees the new one
+                    self._checked = 0.0
+        return self._reader
+
+    def neighbors(self, book_id: int, limit: int):
+        # [(book id, score)] best first; [] if the book isn't indexed, None if there is no index
+        arrays = self._arrays()
+        if arrays is None:
+            return None
+        if book_id < 0 or book_id >= arrays.capacity or not arrays.present[book_id]:
+            return []
+        ids = arrays.neighbors[book_id, :limit]
+        scores = arrays.scores[book_id, :limit]
+        return [(int(i), round(float(s), 4)) for i, s in zip(ids, scores) if i >= 0]
+
+    # --- Writing ---
+    @contextmanager
+    def _writing(self):
+        # One writer at a time, across threads and processes
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, open(os.path.join(self.root, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _publish(self, path: str):
+        pointer = os.path.join(self.root, f"{CURRENT}.tmp")
+        with open(pointer, "w", encoding="utf-8") as current:
+            current.write(os.path.basename(path))
+        os.replace(pointer, os.path.join(self.root, CURRENT))
+        # Processes still mapping an old build keep reading it until they switch over
+        for name in os.listdir(self.root):
+            if name.startswith("build-") and os.path.join(self.root, name) != path:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def _new_path(self) -> str:
+        return os.path.join(self.root, f"build-{time.time_ns()}")
+
+    def build(self, load_books) -> dict:
+        # load_books() iterates over every book (FEATURE_COLUMNS); it is called twice
+        np = _numpy()
+        with self._writing():
+            # Pass 1: document frequencies and the id range
+            df = np.zeros(IDF_BUCKETS, dtype=np.int64)
+            documents = max_id = 0
+            for book in load_books():
+                df[list({_hash(token) % IDF_BUCKETS for token in _tokens(book)})] += 1
+                documents += 1
+                max_id = max(max_id, book.id)
+            idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+
+            # Pass 2: vectors
+            path = self._new_path()
+            arrays = _create_arrays(np, path, _capacity(max_id + 1), idf, documents)
+            batch = []
+            for book in load_books():
+                batch.append(book)
+                if len(batch) == LOAD_BATCH:
+                    self._write_vectors(np, arrays, batch)
+                    batch = []
+            if batch:
+                self._write_vectors(np, arrays, batch)
+
+            # All pairs, a block of queries against blocks of rows at a time
+            k = arrays.meta["k"]
+            rows = np.flatnonzero(arrays.present)
+            matrix = np.ascontiguousarray(arrays.vectors[rows])
+            for start in range(0, len(rows), QUERY_BLOCK):
+                query_ids = rows[start:start + QUERY_BLOCK]
+                queries = matrix[start:start + QUERY_BLOCK]
+                best_ids, best_scores = _empty_top_k(np, len(query_ids), k)
+                for offset in range(0, len(rows), ROW_BLOCK):
+                    block_ids = rows[offset:offset + ROW_BLOCK]
+                    scores = queries @ matrix[offset:offset + ROW_BLOCK].T
+                    scores[query_ids[:, None] == block_ids[None, :]] = -np.inf
+                    best_ids, best_scores = _merge(np, best_ids, best_scores, scores, block_ids, k)
+                arrays.neighbors[query_ids], arrays.scores[query_ids] = _ranked(np, best_ids, best_scores)
+
+            arrays.flush()
+            self._publish(path)
+        return {"books": documents, "capacity": arrays.capacity, "dimensions": int(matrix.shape[1])}
+
+    def _write_vectors(self, np, arrays: _Arrays, books):
+        ids = np.fromiter((book.id for book in books), dtype=np.int64, count=len(books))
+        arrays.vectors[ids] = featurize(np, books, arrays.idf, arrays.meta["text_dim"])
+        arrays.present[ids] = True
+
+    def _writable(self, np):
+        path = self._current_path()
+        return _Arrays(np, path, "r+") if path else None
+
+    def _grow(self, np, arrays: _Arrays, capacity: int) -> _Arrays:
+        path = self._new_path()
+        grown = _create_arrays(np, path, capacity, arrays.idf, arrays.meta["documents"])
+        rows = arrays.capacity
+        grown.vectors[:rows] = arrays.vectors
+        grown.present[:rows] = arrays.present
+        grown.neighbors[:rows] = arrays.neighbors
+        grown.scores[:rows] = arrays.scores
+        grown.flush()
+        self._publish(path)
+        return grown
+
+    def upsert(self, books) -> bool:
+        # Adds or refreshes `books`; False if there is no index to update yet
+        np = _numpy()
+        with self._writing():
+            arrays = self._writable(np)
+            if arrays is None:
+                return False
+            needed = max(book.id for book in books) + 1
+            if needed > arrays.capacity:
+                arrays = self._grow(np, arrays, _capacity(needed))
+
+            k = arrays.meta["k"]
+            ids = np.array([book.id for book in books], dtype=np.int64)
+            vectors = featurize(np, books, arrays.idf, arrays.meta["text_dim"])
+            arrays.vectors[ids] = vectors
+            arrays.present[ids] = True
+
+            best_ids, best_scores = _empty_top_k(np, len(ids), k)
+            rows = np.flatnonzero(arrays.present)
+            for offset in range(0, len(rows), ROW_BLOCK):
+                block_ids = rows[offset:offset + ROW_BLOCK]
+                scores = arrays.vectors[block_ids] @ vectors.T
+                scores[block_ids[:, None] == ids[None, :]] = -np.inf
+                # The changed books' own neighbours...
+                best_ids, best_scores = _merge(np, best_ids, best_scores, scores.T, block_ids, k)
+                # ...and their place in everybody else's
+                self._update_lists(np, arrays, block_ids, scores, ids)
+            arrays.neighbors[ids], arrays.scores[ids] = _ranked(np, best_ids, best_scores)
+            arrays.flush()
+        return True
+
+    def _update_lists(self, np, arrays: _Arrays, block_ids, scores, ids):
+        neighbors = np.array(arrays.neighbors[block_ids])
+        best = np.array(arrays.scores[block_ids])
+        changed = np.zeros(len(block_ids), dtype=bool)
+        for column, book_id in enumerate(ids):
+            score = scores[:, column]
+            listed = neighbors == book_id
+            in_list = listed.any(axis=1)
+            # Already a neighbour: its score may have moved
+            best = np.where(listed, score[:, None], best)
+            # Not yet: it takes the last place if it beats it
+            enter = ~in_list & (score > best[:, -1])
+            neighbors[enter, -1] = book_id
+            best[enter, -1] = score[enter]
+            changed |= in_list | enter
+        if changed.any():
+            rows = block_ids[changed]
+            arrays.neighbors[rows], arrays.scores[rows] = _ranked(np, neighbors[changed], best[changed])
+
+    def remove(self, book_ids):
+        np = _numpy()
+        with self._writing():
+            arrays = self._writable(np)
+            if arrays is None:
+                return
+            ids = np.array([i for i in book_ids if 0 <= i < arrays.capacity], dtype=np.int64)
+            if not len(ids):
+                return
+            arrays.present[ids] = False
+            arrays.vectors[ids] = 0
+            arrays.neighbors[ids] = -1
+            arrays.scores[ids] = -np.inf
+            # Drop them from every list; the freed places fill up at the next rebuild
+            for offset in range(0, arrays.capacity, ROW_BLOCK):
+                neighbors = np.array(arrays.neighbors[offset:offset + ROW_BLOCK])
+                hit = np.isin(neighbors, ids)
+                rows = np.flatnonzero(hit.any(axis=1))
+                if len(rows):
+                    scores = np.where(hit, -np.inf, arrays.scores[offset:offset + ROW_BLOCK])
+                    arrays.neighbors[offset + rows], arrays.scores[offset + rows] = _ranked(
+                        np, neighbors[rows], scores[rows]
+                    )
+            arrays.flush()
+
+
+similar_index = SimilarIndex(config.SIMILAR_DIR)
+
+
+# --- Loading books (worker threads, blocking engine) ---
+def _stream_books():
+    with SessionLocal() as db:
+        result = db.execute(select(*FEATURE_COLUMNS).order_by(Book.id).execution_options(yield_per=LOAD_BATCH))
+        yield from result
+
+
+def _load_books(book_ids):
+    with SessionLocal() as db:
+        return db.execute(select(*FEATURE_COLUMNS).where(Book.id.in_(book_ids))).all()
+
+
+def rebuild() -> dict:
+    return similar_index.build(_stream_books)
+
+
+def sync_books(book_ids) -> dict:
+    # Brings the index in line with the database for these books
+    if len(book_ids) > config.SIMILAR_REBUILD_THRESHOLD:
+        return rebuild()
+    books = _load_books(book_ids)
+    deleted = sorted(set(book_ids) - {book.id for book in books})
+    if deleted:
+        similar_index.remove(deleted)
+    if books and not similar_index.upsert(books):
+        # No index yet: build one (it includes these books)
+        return rebuild()
+    return {"updated": len(books), "removed": len(deleted)}
+
+
+# --- Jobs ---
+SYNC = "similar.sync"
+REBUILD = "similar.rebuild"
+
+
+def queue_sync(db: Session, book_ids):
+    # Call in the transaction that changes the books
+    if NUMPY_INSTALLED:
+        enqueue(db, SYNC, {"book_ids": list(book_ids)})
+
+
+def queue_rebuild(db: Session):
+    if NUMPY_INSTALLED and not db.query(Job.id).filter(Job.kind == REBUILD, Job.status == QUEUED).first():
+        enqueue(db, REBUILD, {})
+
+
+@handler(SYNC)
+async def sync_jobs(jobs) -> dict:
+    book_ids = sorted({book_id for job in jobs for book_id in job.payload["book_ids"]})
+    # numpy releases the GIL in the products: keep them off the event loop
+    result = await run_in_threadpool(sync_books, book_ids)
+    return {job.id: result for job in jobs}
+
+
+@handler(REBUILD)
+async def rebuild_jobs(jobs) -> dict:
+    result = await run_in_threadpool(rebuild)
+    return {job.id: result for job in jobs}
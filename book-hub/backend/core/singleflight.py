@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+from core.metrics import flights_coalesced, flights_started, registry
+
+
+# Request coalescing ("single flight") for catalog reads. When a popular key
+# misses the cache, e.g. right after a write or an expiry, every concurrent
+# request for it would run the same query and serialize the same result.
+# Instead the first one starts the work and the others wait for its result.
+#
+# Keys are cache keys, so they carry the cache generation: a request that
+# arrives after a write never joins a read that started before it.
+# The work runs as its own task with its own session: if the request that
+# started it goes away (client disconnect), the ones waiting still get the
+# result. Per process; each worker coalesces its own requests.
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, asyncio.Task] = {}
+        registry.collectors.append(self._samples)
+
+    def _samples(self):
+        return [("bookhub_singleflight_in_flight", "gauge", "Distinct reads currently running.",
+                 [({"flight": self.name}, len(self._flights))])]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        # fn() runs at most once at a time per key; everyone gets its result (or exception)
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            flights_started.inc(self.name)
+        else:
+            flights_coalesced.inc(self.name)
+        # Shielded: a caller being cancelled must not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here so an error nobody waited for isn't logged as "never retrieved"
+            task.exception()
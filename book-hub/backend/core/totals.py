@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+
+# Totals for list endpoints without a separate COUNT(*) round trip.
+#
+# - count="exact":    the total rides along with the page query as a scalar subquery
+# - count="estimate": unfiltered listings use a per-process row counter that is
+#                     seeded once with COUNT(*), adjusted on ORM inserts/deletes
+#                     and re-seeded every RESEED_SECONDS (other workers' writes)
+# - count="none":     no total at all
+
+COUNT_MODES = ("exact", "estimate", "none")
+RESEED_SECONDS = 60.0
+
+
+def total_subquery(query):
+    # COUNT(*) over the ids the (filtered, unordered) query would return
+    ids = query.with_entities(query.column_descriptions[0]["entity"].id).order_by(None).subquery()
+    return select(func.count()).select_from(ids).scalar_subquery()
+
+
+def split_total(rows):
+    # Rows from query.add_columns(total_subquery(...)) -> (entities, total)
+    if not rows:
+        return [], None
+    return [row[0] for row in rows], rows[0][1]
+
+
+class RowCounter:
+    def __init__(self, model):
+        self.model = model
+        self._value = None
+        self._seeded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> int:
+        with self._lock:
+            fresh = time.monotonic() - self._seeded_at < RESEED_SECONDS
+            if self._value is not None and fresh:
+                return self._value
+        value = db.query(func.count(self.model.id)).scalar()
+        with self._lock:
+            self._value = value
+            self._seeded_at = time.monotonic()
+        return value
+
+    def adjust(self, delta: int):
+        with self._lock:
+            if self._value is not None:
+                self._value = max(0, self._value + delta)
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+_counters: Dict[type, RowCounter] = {}
+
+
+def row_counter(model) -> RowCounter:
+    if model not in _counters:
+        _counters[model] = RowCounter(model)
+    return _counters[model]
+
+
+# Pending deltas are collected per session on flush and only applied on commit
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session, flush_context):
+    deltas = session.info.setdefault("row_count_deltas", {})
+    for obj in session.new:
+        if type(obj) in _counters:
+            deltas[type(obj)] = deltas.get(type(obj), 0) + 1
+    for obj in session.deleted:
+        if type(obj) in _counters:
+            deltas[type(obj)] = deltas.get(type(obj), 0) - 1
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_deltas(session):
+    for model, delta in session.info.pop("row_count_deltas", {}).items():
+        _counters[model].adjust(delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session):
+    session.info.pop("row_count_deltas", None)
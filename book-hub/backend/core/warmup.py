@@ -0,0 +1,67 @@
+import logging
+import time
+
+from core import config
+from db.session import prime_pool
+
+
+# Startup warm-up (WARMUP_ON_STARTUP): connect the pool, then send WARMUP_PATHS
+# through the whole app once. That fills the catalog cache and compiles the SQL
+# and serializers those requests use, so the first users after a deploy or a
+# scale-up don't pay for it. Failures are logged and never stop the startup.
+
+logger = logging.getLogger("bookhub.startup")
+
+
+async def _get(app, target: str) -> int:
+    # Minimal in-process ASGI GET; returns the status code
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "root_path": "",
+        "query_string": query.encode("latin-1"),
+        "headers": [(b"host", b"warmup")],
+        "client": ("warmup", 0),
+        "server": ("warmup", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def warm_up(app) -> dict:
+    timings = {}
+    started = time.perf_counter()
+    try:
+        await prime_pool()
+    except Exception:
+        logger.exception("warm-up: could not open the connection pool")
+    timings["pool"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for target in (path.strip() for path in config.WARMUP_PATHS.split(",")):
+        if not target:
+            continue
+        try:
+            status = await _get(app, target)
+            if status >= 400:
+                logger.warning("warm-up: GET %s answered %s", target, status)
+        except Exception:
+            logger.exception("warm-up: GET %s failed", target)
+    timings["requests"] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from sqlalchemy import inspect
+
+from db.session import engine
+from core.search import ensure_search_index
+from core.facets import ensure_facets
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+# Revision matching the schema create_all used to build
+BASELINE_REVISION = "0001"
+
+
+# Alembic is imported only when migrations run (it is slow to import and
+# deployments with INIT_DB_ON_STARTUP=false never need it in the app)
+def _alembic_config(connection):
+    from alembic.config import Config
+
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def migrate():
+    # Bring the schema up to date (same as `alembic upgrade head`)
+    from alembic import command
+
+    with engine.begin() as connection:
+        cfg = _alembic_config(connection)
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables and "books" in tables:
+            # Created by create_all before migrations existed: adopt it as the baseline
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, "head")
+
+
+def init_db():
+    # Create/upgrade all database tables
+    migrate()
+    # Create/backfill the full-text search index for books
+    ensure_search_index(engine)
+    # Create/backfill the facet counts used for browsing
+    ensure_facets(engine)
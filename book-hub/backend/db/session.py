@@ -1,16 +1,151 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from core import config
+from core.metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+
+
+DATABASE_URL = config.DATABASE_URL
+
+# Same database through an asyncio driver
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url: str) -> str:
+    if config.ASYNC_DATABASE_URL:
+        return config.ASYNC_DATABASE_URL
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
 
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
 
-DATABASE_URL = "sqlite:///./app.db"
 
+def _engine_options(url: str, is_async: bool = False) -> dict:
+    parsed = make_url(url)
+    options = {}
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection, no pool to size
+            return options
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        # Server databases can drop idle connections; a local file cannot
+        options["pool_pre_ping"] = config.DB_POOL_PRE_PING
+    options.update(
+        # Same QueuePool as the default, plus checkout wait metrics
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    return options
 
-engine = create_engine(
-DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _configure(sync_engine):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    instrument_engine(sync_engine)
+    return sync_engine
+
+
+engine = _configure(create_engine(DATABASE_URL, **_engine_options(DATABASE_URL)))
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-Base = declarative_base()
\ No newline at end of file
+# Async engine: same database, driven by aiosqlite/asyncpg so a query never blocks the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, is_async=True)
+) if config.USE_ASYNC_DB else None
+if async_engine is not None:
+    _configure(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autocommit=False, autoflush=False, expire_on_commit=True
+) if config.USE_ASYNC_DB else None
+
+
+Base = declarative_base()
+
+
+def _open_connections(sync_engine, count: int):
+    connections = [sync_engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+
+async def prime_pool():
+    # Opens DB_POOL_SIZE connections and returns them to the pool, so the first
+    # requests don't pay for connecting (and the SQLite pragmas) themselves
+    if async_engine is not None:
+        connections = [await async_engine.connect() for _ in range(config.DB_POOL_SIZE)]
+        for connection in connections:
+            await connection.close()
+    else:
+        await run_in_threadpool(_open_connections, engine, config.DB_POOL_SIZE)
+
+
+class Database:
+    # Runs a unit of work `fn(session, *args)` written against the regular ORM
+    # Session API. With an AsyncSession it goes through run_sync (awaiting the
+    # driver for every round trip); with a plain Session it runs in the threadpool,
+    # exactly like the old sync handlers.
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def stream(self, stmt, batch_size: int):
+        # Yields lists of result mappings, at most `batch_size` rows held at a time
+        stmt = stmt.execution_options(yield_per=batch_size)
+        if isinstance(self.session, AsyncSession):
+            result = await self.session.stream(stmt)
+            async for partition in result.mappings().partitions():
+                yield partition
+            return
+
+        result = await run_in_threadpool(self.session.execute, stmt)
+        async for partition in iterate_in_threadpool(result.mappings().partitions()):
+            yield partition
+
+
+@asynccontextmanager
+async def session_scope():
+    if config.USE_ASYNC_DB:
+        async with AsyncSessionLocal() as session:
+            yield Database(session)
+    else:
+        db = SessionLocal()
+        try:
+            yield Database(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+# Dependency to get DB session
+async def get_db():
+    async with session_scope() as db:
+        yield db
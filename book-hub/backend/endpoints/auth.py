@@ -1,50 +1,30 @@
-import bcrypt
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer
 
-from db.session import SessionLocal
+from db.session import Database, get_db
 from models.user import User
 from schemas.user import UserCreate, UserOut, Token, LoginRequest
-from core.security import create_access_token, decode_access_token
+from core.security import HashingBusy, create_access_token, needs_rehash, password_hasher
+from endpoints.deps import get_current_account
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
-
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# --- Helper functions using bcrypt ---
-def get_password_hash(password: str) -> str:
-    # bcrypt expects bytes
-    password_bytes = password.encode("utf-8")[:72]  # truncate to 72 bytes
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
-    return hashed.decode("utf-8")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    plain_bytes = plain_password.encode("utf-8")[:72]
-    hashed_bytes = hashed_password.encode("utf-8")
-    return bcrypt.checkpw(plain_bytes, hashed_bytes)
+# --- Helper functions ---
+def _too_busy():
+    # The password hashing pool is saturated: shed load instead of queueing
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
-# --- Routes ---
-@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    existing = db.query(User).filter(User.email == user_in.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
 
-    # Hash password
-    hashed_password = get_password_hash(user_in.password)
 
+def _create_user(db: Session, user_in: UserCreate, hashed_password: str):
     # Create user
     user = User(
         email=user_in.email,
@@ -58,30 +38,53 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
     return user
 
 
+def _update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
+
+
+# --- Routes ---
+@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+async def register(user_in: UserCreate, db: Database = Depends(get_db)):
+    # Check if user already exists
+    existing = await db.run(_get_user_by_email, user_in.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Hash password (bcrypt is CPU bound, it runs in its own bounded pool)
+    try:
+        hashed_password = await password_hasher.hash(user_in.password)
+    except HashingBusy:
+        raise _too_busy()
+
+    return await db.run(_create_user, user_in, hashed_password)
+
+
 @router.post("/token", response_model=Token)
-def login_for_access_token(credentials: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+async def login_for_access_token(credentials: LoginRequest, db: Database = Depends(get_db)):
+    user = await db.run(_get_user_by_email, credentials.email)
+    try:
+        valid = user is not None and await password_hasher.verify(credentials.password, user.hashed_password)
+    except HashingBusy:
+        raise _too_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
+
+    # Upgrade hashes made with an older BCRYPT_ROUNDS while we have the password
+    if needs_rehash(user.hashed_password):
+        try:
+            await db.run(_update_password_hash, user.id, await password_hasher.hash(credentials.password))
+        except HashingBusy:
+            pass  # try again on a later login
+
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserOut)
-def read_users_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    try:
-        payload = decode_access_token(token)
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Could not validate credentials")
-    except Exception:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
-
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+async def read_users_me(current_user: dict = Depends(get_current_account)):
+    return current_user
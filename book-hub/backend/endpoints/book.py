@@ -1,48 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import asyncio
+import io
+import json
+import tempfile
+from datetime import datetime
 
-from db.session import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional, Tuple, Union
+
+from db.session import Database, get_db, session_scope
+from endpoints.deps import get_current_user
 from models.book import Book, CartItem, ServiceRequest
 from schemas.book import (
-    BookCreate, BookUpdate, BookOut,
-    CartItemCreate, CartItemUpdate, CartItemOut,
-    ServiceRequestCreate, ServiceRequestUpdate, ServiceRequestOut
+    Page, BookCreate, BookUpdate, BookOut, BookSummaryOut, BOOK_FIELDS, book_projection, BookBatchOut, SimilarBooksOut,
+    CartItemCreate, CartItemUpdate, CartItemOut, CartBatchUpdate, CartViewOut, CheckoutOut,
+    ServiceRequestCreate, ServiceRequestUpdate, ServiceRequestOut, ServiceRequestCreatedOut
 )
-from core.security import decode_access_token
-from fastapi.security import OAuth2PasswordBearer
+from core.search import apply_search
+from core.facets import get_facets
+from core.pagination import apply_keyset, fetch_page, next_cursor_for
+from core.totals import row_counter
+from core.bulk import ImportReport, iter_records, next_batch, upsert_books
+from core import export
+from core import service_requests
+from core import similar
+from core.jobs import enqueue, job_queue
+from core.cache import cache
+from core.singleflight import SingleFlight
+from core.conditional import book_etag, conditional, content_etag, http_date, if_match_failed, listing_etag
+from core import config
 
 # Routers
 books_router = APIRouter(prefix="/books", tags=["Books"])
 cart_router = APIRouter(prefix="/cart", tags=["Cart"])
 service_requests_router = APIRouter(prefix="/service-requests", tags=["Service Requests"])
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# Cache group for everything derived from the books table
+CATALOG = "catalog"
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Identical reads that miss the cache at the same time run once (core/singleflight.py)
+catalog_flights = SingleFlight("catalog")
 
-# Auth dependency
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = decode_access_token(token)
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials"
-            )
-        return email
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
-        )
+async def _read(fn, *args):
+    # Shared reads use their own session: they can outlive the request that started them
+    async with session_scope() as db:
+        return await db.run(fn, *args)
+
+# List pages are validated from the ORM rows and dumped to JSON by pydantic-core
+# in one pass, skipping FastAPI's jsonable_encoder walk over every item
+def _json_page(page: BaseModel) -> Response:
+    return Response(content=page.model_dump_json(), media_type="application/json")
 
 # =========================================================================
 # BOOKS ENDPOINTS
@@ -51,95 +65,518 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 # -------------------------------
 # CREATE
 # -------------------------------
-@books_router.post("/", response_model=BookOut, status_code=status.HTTP_201_CREATED)
-def create_book(
-    book_in: BookCreate, 
-    db: Session = Depends(get_db),
-    # current_user: str = Depends(get_current_user)
-):
+def _create_book(db: Session, book_in: BookCreate):
     book = Book(**book_in.dict())
     db.add(book)
+    db.flush()
+    similar.queue_sync(db, [book.id])
     db.commit()
     db.refresh(book)
     return BookOut.from_orm(book)
 
+@books_router.post("/", response_model=BookOut, status_code=status.HTTP_201_CREATED)
+async def create_book(
+    book_in: BookCreate, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    book = await db.run(_create_book, book_in)
+    cache.invalidate(CATALOG)
+    job_queue.wake()
+    return book
+
 # -------------------------------
-# READ - List with pagination & filters
+# CREATE - Bulk import / upsert by ISBN
 # -------------------------------
-@books_router.get("/", response_model=dict)
-def list_books(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = Query(10, le=100),
-    title: Optional[str] = None,
-    author: Optional[str] = None,
+BULK_CONTENT_TYPES = {
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+    "text/csv": "csv",
+}
+
+@books_router.post("/bulk")
+async def bulk_import_books(
+    request: Request,
+    db: Database = Depends(get_db),
+    format: Optional[Literal["jsonl", "csv"]] = None,
     # current_user: str = Depends(get_current_user)
 ):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or BULK_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send JSON Lines (application/x-ndjson) or CSV (text/csv), or pass ?format="
+        )
+
+    # Spool the upload (memory first, then disk) instead of holding it as one string
+    with tempfile.SpooledTemporaryFile(max_size=config.BULK_SPOOL_MAX_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        lines = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        records = iter_records(lines, fmt)
+        report = ImportReport(config.BULK_MAX_ERRORS, config.SIMILAR_REBUILD_THRESHOLD)
+
+        # Parsing/validation runs in the threadpool and overlaps with writing the previous batch
+        parse = lambda: asyncio.ensure_future(run_in_threadpool(next_batch, records, config.BULK_BATCH_SIZE))
+        pending = parse()
+        try:
+            while True:
+                batch = await pending
+                if not batch:
+                    break
+                pending = parse()
+                report.add(batch, await db.run(upsert_books, batch))
+        finally:
+            # Never close the spool under a parser thread that is still reading it
+            await asyncio.gather(pending, return_exceptions=True)
+        lines.detach()
+
+    if report.created or report.updated:
+        row_counter(Book).invalidate()
+        cache.invalidate(CATALOG)
+        await db.run(_queue_similar_import, report.book_ids)
+        job_queue.wake()
+    return report.as_dict()
+
+# -------------------------------
+# READ - List with pagination & filters
+# -------------------------------
+# Columns loaded for ?view=summary (the ORM needs the version column too)
+SUMMARY_COLUMNS = [getattr(Book, name) for name in BookSummaryOut.model_fields]
+
+# Sparse fieldsets always carry these: (id, version) is what a client needs to
+# refetch or update the book
+FIELDS_ALWAYS = ("id", "version")
+
+# What ?fields= may name: BookOut fields that are columns of books, in BookOut
+# order (BookOut.created_at is not one, books has no such column)
+FIELD_COLUMNS = {name: getattr(Book, name) for name in BOOK_FIELDS if name in Book.__table__.columns}
+
+def _field_columns(fields: Tuple[str, ...]) -> list:
+    return [FIELD_COLUMNS[name] for name in fields]
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(FIELD_COLUMNS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}")
+    # Declaration order, so equivalent requests share a model and a cache entry
+    return tuple(name for name in FIELD_COLUMNS if name in requested or name in FIELDS_ALWAYS)
+
+# Sortable columns (each has a (column, id) index for keyset paging)
+BOOK_SORTS = {
+    "id": Book.id,
+    "title": Book.title,
+    "price": Book.price,
+    "rating": Book.rating,
+    "genre": Book.genre,
+    "language": Book.language,
+    "publisher": Book.publisher,
+}
+
+def _list_books(
+    db: Session,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    count: str,
+    q: Optional[str],
+    title: Optional[str],
+    author: Optional[str],
+    filters: dict,
+    sort: Optional[str],
+    order: str,
+    view: str,
+    fields: Optional[Tuple[str, ...]],
+):
+    sort_column = BOOK_SORTS[sort or "id"]
     query = db.query(Book)
+    if fields:
+        # Only the requested columns, plus the one the next cursor is built from
+        query = query.options(load_only(*_field_columns(fields), sort_column))
+    elif view == "summary":
+        query = query.options(load_only(*SUMMARY_COLUMNS))
 
+    # Full-text search (title, author, description, publisher), ranked by relevance
+    if q:
+        query = apply_search(query, q, db.get_bind().dialect.name)
     if title:
         query = query.filter(Book.title.ilike(f"%{title}%"))
     if author:
         query = query.filter(Book.author.ilike(f"%{author}%"))
+    if filters["genre"]:
+        query = query.filter(Book.genre == filters["genre"])
+    if filters["language"]:
+        query = query.filter(Book.language == filters["language"])
+    if filters["publisher"]:
+        query = query.filter(Book.publisher == filters["publisher"])
+    if filters["min_price"] is not None:
+        query = query.filter(Book.price >= filters["min_price"])
+    if filters["max_price"] is not None:
+        query = query.filter(Book.price < filters["max_price"])
+    if filters["min_rating"] is not None:
+        query = query.filter(Book.rating >= filters["min_rating"])
+    if filters["max_rating"] is not None:
+        query = query.filter(Book.rating < filters["max_rating"])
+
+    if sort_column is not Book.id:
+        # Books without a value for the sort column are left out of that ordering
+        query = query.filter(sort_column.isnot(None))
+
+    # Unfiltered listings can use the cached catalog size instead of counting
+    unfiltered = not (q or title or author or sort_column is not Book.id or any(v is not None for v in filters.values()))
+    estimate = (lambda: row_counter(Book).get(db)) if unfiltered else None
+
+    # Search results are in relevance order, so they only page with skip/limit
+    if q:
+        if cursor or sort:
+            raise HTTPException(status_code=400, detail="cursor and sort are not supported together with q")
+        books, has_more, total = fetch_page(query, query.order_by(Book.id), skip, limit, count)
+        next_cursor = None
+    else:
+        sort_key = f"{sort or 'id'}:{order}"
+        descending = order == "desc"
+        ordered = apply_keyset(query, sort_column, Book.id, cursor, sort_key=sort_key, descending=descending)
+        books, has_more, total = fetch_page(query, ordered, skip, limit, count, estimate, cursor)
+        next_cursor = next_cursor_for(books, has_more, sort_key=sort_key, sort_attr=sort_column.key)
+
+    if fields:
+        page_model = Page[book_projection(fields)]
+    else:
+        page_model = Page[BookSummaryOut] if view == "summary" else Page[BookOut]
+    return page_model(total=total, items=books, next_cursor=next_cursor)
+
+async def _fetch_books(key: str, *args) -> dict:
+    page = await _read(_list_books, *args)
+    # Cached as the serialized body, so a hit is sent without touching pydantic
+    entry = {"json": page.model_dump_json(), "etag": listing_etag(page.total, page.next_cursor, page.items)}
+    cache.set(key, entry, ttl=config.CACHE_LIST_TTL_SECONDS)
+    return entry
+
+@books_router.get("/", response_model=Union[Page[BookOut], Page[BookSummaryOut]])
+async def list_books(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(10, le=100),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimate", "none"] = "exact",
+    q: Optional[str] = None,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[str] = None,
+    language: Optional[str] = None,
+    publisher: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = Query(None, description="Exclusive, matches the price facet buckets"),
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = Query(None, description="Exclusive, matches the rating facet buckets"),
+    sort: Optional[Literal["id", "title", "price", "rating", "genre", "language", "publisher"]] = None,
+    order: Literal["asc", "desc"] = "asc",
+    view: Literal["full", "summary"] = Query("full", description="summary omits description and dates"),
+    fields: Optional[str] = Query(None, description="Comma separated book fields to return (id and version are always included); overrides view"),
+    # current_user: str = Depends(get_current_user)
+):
+    filters = {
+        "genre": genre, "language": language, "publisher": publisher,
+        "min_price": min_price, "max_price": max_price,
+        "min_rating": min_rating, "max_rating": max_rating,
+    }
+    fields = _parse_fields(fields)
+    key = cache.key(CATALOG, "books", skip, limit, cursor, count, q, title, author, sort, order, view, fields, **filters)
+    entry = cache.get(key)
+    if entry is None:
+        entry = await catalog_flights.do(key, lambda: _fetch_books(
+            key, skip, limit, cursor, count, q, title, author, filters, sort, order, view, fields
+        ))
+
+    # No Last-Modified on listings: a deletion changes the page without a newer timestamp
+    body = Response(content=entry["json"], media_type="application/json")
+    not_modified = conditional(request, body, entry["etag"])
+    if not_modified:
+        return not_modified
+    return body
+
+# -------------------------------
+# READ - Facet counts for browsing
+# -------------------------------
+@books_router.get("/facets", response_model=dict)
+async def book_facets(
+    request: Request,
+    response: Response,
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    key = cache.key(CATALOG, "facets")
+    entry = cache.get(key)
+    if entry is None:
+        body = await db.run(get_facets)
+        entry = {"body": body, "etag": content_etag("f", body)}
+        cache.set(key, entry)
+
+    not_modified = conditional(request, response, entry["etag"])
+    if not_modified:
+        return not_modified
+    return entry["body"]
+
+# -------------------------------
+# READ - Export the whole catalog (streamed)
+# -------------------------------
+@books_router.get("/export")
+async def export_books(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    # current_user: str = Depends(get_current_user)
+):
+    encode = export.encode_csv if format == "csv" else export.encode_ndjson
+
+    async def body():
+        # The request's own session is closed before streaming starts, so use a dedicated one
+        if format == "csv":
+            yield export.csv_header()
+        async with session_scope() as db:
+            async for rows in db.stream(export.export_statement(), config.EXPORT_BATCH_SIZE):
+                yield encode(rows)
+
+    return StreamingResponse(
+        body(),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
+
+# -------------------------------
+# READ - Batch by ids or ISBNs
+# -------------------------------
+# Declared before /{book_id} so "batch" isn't taken for an id
+def _split_values(raw: str) -> List[str]:
+    return [value.strip() for value in raw.split(",") if value.strip()]
+
+def _get_books(db: Session, by: str, values: list, fields: Optional[Tuple[str, ...]]):
+    # One IN (...) query; returns {id or isbn: cache entry}
+    column = getattr(Book, by)
+    query = db.query(Book).filter(column.in_(values))
+    if fields:
+        query = query.options(load_only(*_field_columns(fields), Book.updated_at, column))
+    return {getattr(book, by): _book_entry(book, fields) for book in query}
 
-    total = query.count()
-    books = query.offset(skip).limit(limit).all()
+@books_router.get("/batch", response_model=BookBatchOut)
+async def get_books_batch(
+    request: Request,
+    db: Database = Depends(get_db),
+    ids: Optional[str] = Query(None, description="Comma separated book ids"),
+    isbns: Optional[str] = Query(None, description="Comma separated ISBNs"),
+    fields: Optional[str] = Query(None, description="Comma separated book fields to return (id and version are always included)"),
+    # current_user: str = Depends(get_current_user)
+):
+    if (ids is None) == (isbns is None):
+        raise HTTPException(status_code=400, detail="Pass either ids or isbns")
+    fields = _parse_fields(fields)
+    if ids is not None:
+        by = "id"
+        try:
+            values = [int(value) for value in _split_values(ids)]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be integers")
+    else:
+        by = "isbn"
+        values = _split_values(isbns)
+    # Repeats are answered once, at their first position
+    values = list(dict.fromkeys(values))
+    if not values:
+        raise HTTPException(status_code=400, detail="No ids or isbns given")
+    if len(values) > config.BOOK_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {config.BOOK_BATCH_MAX} books per request")
 
-    book_list = [BookOut.from_orm(b) for b in books]
-    return {"total": total, "items": book_list}
+    # By id, the entries are get_book's own; cached ones don't touch the database
+    keys = cache.keys(CATALOG, [("book" if by == "id" else "book-isbn", value, fields) for value in values])
+    entries = dict(zip(values, cache.get_many(keys)))
+    todo = [value for value in values if entries[value] is None]
+    if todo:
+        found = await db.run(_get_books, by, todo, fields)
+        for value, key in zip(values, keys):
+            if value in found:
+                entries[value] = found[value]
+                cache.set(key, found[value])
+
+    found = [entries[value] for value in values if entries[value] is not None]
+    missing = [value for value in values if entries[value] is None]
+    # The items are already JSON: join them rather than parse and re-dump
+    content = '{"items":[' + ",".join(entry["json"] for entry in found) + '],"missing":' + json.dumps(missing) + "}"
+    body = Response(content=content, media_type="application/json")
+    not_modified = conditional(request, body, content_etag("m", [[entry["etag"] for entry in found], missing]))
+    if not_modified:
+        return not_modified
+    return body
 
 # -------------------------------
 # READ - Single book
 # -------------------------------
+def _book_entry(book: Book, fields: Optional[Tuple[str, ...]]) -> dict:
+    # What the cache holds for one book
+    model = book_projection(fields) if fields else BookOut
+    return {
+        "json": model.model_validate(book).model_dump_json(),
+        "etag": book_etag(book.id, book.version),
+        "last_modified": http_date(book.updated_at) if book.updated_at else None,
+    }
+
+def _get_book(db: Session, book_id: int, fields: Optional[Tuple[str, ...]] = None):
+    query = db.query(Book).filter(Book.id == book_id)
+    if fields:
+        # updated_at feeds Last-Modified even when it isn't returned
+        query = query.options(load_only(*_field_columns(fields), Book.updated_at))
+    book = query.first()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return _book_entry(book, fields)
+
+async def _fetch_book(key: str, book_id: int, fields: Optional[Tuple[str, ...]]) -> dict:
+    entry = await _read(_get_book, book_id, fields)
+    cache.set(key, entry)
+    return entry
+
 @books_router.get("/{book_id}", response_model=BookOut)
-def get_book(
+async def get_book(
     book_id: int, 
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma separated book fields to return (id and version are always included)"),
     # current_user: str = Depends(get_current_user)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    return BookOut.from_orm(book)
+    fields = _parse_fields(fields)
+    key = cache.key(CATALOG, "book", book_id, fields)
+    entry = cache.get(key)
+    if entry is None:
+        entry = await catalog_flights.do(key, lambda: _fetch_book(key, book_id, fields))
+
+    body = Response(content=entry["json"], media_type="application/json")
+    not_modified = conditional(request, body, entry["etag"], entry["last_modified"])
+    if not_modified:
+        return not_modified
+    return body
 
 # -------------------------------
-# UPDATE
+# READ - Similar books (precomputed neighbours, see core/similar.py)
 # -------------------------------
-@books_router.put("/{book_id}", response_model=BookOut)
-def update_book(
-    book_id: int, 
-    book_in: BookUpdate, 
-    db: Session = Depends(get_db),
+def _similar_books(db: Session, book_id: int, neighbours: List[Tuple[int, float]]):
+    ids = [book_id] + [neighbour_id for neighbour_id, _ in neighbours]
+    books = {book.id: book for book in db.query(Book).options(load_only(*SUMMARY_COLUMNS)).filter(Book.id.in_(ids))}
+    if book_id not in books:
+        raise HTTPException(status_code=404, detail="Book not found")
+    items = [
+        {"score": score, "book": books[neighbour_id]}
+        for neighbour_id, score in neighbours if neighbour_id in books
+    ]
+    return SimilarBooksOut(book_id=book_id, items=items)
+
+def _queue_similar_rebuild(db: Session):
+    similar.queue_rebuild(db)
+    db.commit()
+
+def _queue_similar_import(db: Session, book_ids: Optional[set]):
+    # The imported books are folded in one by one, unless there were more than
+    # SIMILAR_REBUILD_THRESHOLD of them (book_ids is None): then it is rebuilt
+    if book_ids is None:
+        similar.queue_rebuild(db)
+    else:
+        similar.queue_sync(db, sorted(book_ids))
+    db.commit()
+
+@books_router.get("/{book_id}/similar", response_model=SimilarBooksOut)
+async def similar_books(
+    book_id: int,
+    db: Database = Depends(get_db),
+    limit: int = Query(10, ge=1, le=config.SIMILAR_TOP_K),
     # current_user: str = Depends(get_current_user)
 ):
+    if not similar.NUMPY_INSTALLED:
+        raise HTTPException(status_code=503, detail="Similar books need numpy (pip install numpy)")
+    neighbours = similar.similar_index.neighbors(book_id, limit)
+    if neighbours is None:
+        # First use: build the index in the background
+        await db.run(_queue_similar_rebuild)
+        job_queue.wake()
+        raise HTTPException(
+            status_code=503,
+            detail="Similar books index is being built, retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    return _json_page(await db.run(_similar_books, book_id, neighbours))
+
+# -------------------------------
+# UPDATE
+# -------------------------------
+def _update_book(db: Session, book_id: int, book_in: BookUpdate, if_match: Optional[str]):
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    for key, value in book_in.dict(exclude_unset=True).items():
+    # If-Match: only update the version the client last saw
+    current = book_etag(book.id, book.version)
+    if if_match_failed(if_match, current):
+        raise HTTPException(status_code=412, detail="Book has been modified", headers={"ETag": current})
+
+    changes = book_in.dict(exclude_unset=True)
+    for key, value in changes.items():
         setattr(book, key, value)
 
-    db.commit()
+    # The ORM issues UPDATE ... WHERE version = <loaded version> (compare-and-swap),
+    # so a write that landed since the read above makes this one match no row
+    try:
+        if changes.keys() & set(similar.FEATURE_FIELDS):
+            # Flushes the UPDATE, so it is inside the compare-and-swap handling too
+            similar.queue_sync(db, [book.id])
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        if if_match is not None:
+            raise HTTPException(status_code=412, detail="Book has been modified")
+        raise HTTPException(status_code=409, detail="Book was modified concurrently, retry the update")
     db.refresh(book)
     return BookOut.from_orm(book)
 
-# -------------------------------
-# DELETE
-# -------------------------------
-@books_router.delete("/{book_id}")
-def delete_book(
+@books_router.put("/{book_id}", response_model=BookOut)
+async def update_book(
     book_id: int, 
-    db: Session = Depends(get_db),
+    book_in: BookUpdate, 
+    request: Request,
+    response: Response,
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
+    book = await db.run(_update_book, book_id, book_in, request.headers.get("if-match"))
+    cache.invalidate(CATALOG)
+    job_queue.wake()
+    response.headers["ETag"] = book_etag(book.id, book.version)
+    return book
+
+# -------------------------------
+# DELETE
+# -------------------------------
+def _delete_book(db: Session, book_id: int):
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
     db.delete(book)
+    similar.queue_sync(db, [book_id])
     db.commit()
     return {"message": "Book deleted successfully"}
 
+@books_router.delete("/{book_id}")
+async def delete_book(
+    book_id: int, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    result = await db.run(_delete_book, book_id)
+    cache.invalidate(CATALOG)
+    job_queue.wake()
+    return result
+
 # =========================================================================
 # CART ITEMS ENDPOINTS
 # =========================================================================
@@ -147,73 +584,230 @@ def delete_book(
 # -------------------------------
 # CREATE
 # -------------------------------
+def _cart_upsert(db: Session, rows: List[dict], add: bool):
+    # INSERT ... ON CONFLICT (user_id, book_id) DO UPDATE: one atomic statement,
+    # no read-then-write race between concurrent requests for the same cart
+    insert = {"sqlite": sqlite_insert, "postgresql": pg_insert}[db.get_bind().dialect.name]
+    stmt = insert(CartItem).values(rows)
+    quantity = CartItem.quantity + stmt.excluded.quantity if add else stmt.excluded.quantity
+    return stmt.on_conflict_do_update(index_elements=["user_id", "book_id"], set_={"quantity": quantity})
+
+def _create_cart_item(db: Session, cart_item_in: CartItemCreate):
+    # Adds to the quantity if the book is already in the user's cart
+    stmt = _cart_upsert(db, [cart_item_in.dict()], add=True).returning(CartItem)
+    cart_item = db.scalars(stmt).one()
+    db.commit()
+    return CartItemOut.from_orm(cart_item)
+
 @cart_router.post("/", response_model=CartItemOut, status_code=status.HTTP_201_CREATED)
-def create_cart_item(
+async def create_cart_item(
     cart_item_in: CartItemCreate, 
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
-    # Check if item already exists in cart
-    existing_item = db.query(CartItem).filter(
-        CartItem.user_id == cart_item_in.user_id,
-        CartItem.book_id == cart_item_in.book_id
-    ).first()
-    
-    if existing_item:
-        existing_item.quantity += cart_item_in.quantity
-        db.commit()
-        db.refresh(existing_item)
-        return CartItemOut.from_orm(existing_item)
-    
-    cart_item = CartItem(**cart_item_in.dict())
-    db.add(cart_item)
-    db.commit()
-    db.refresh(cart_item)
-    return CartItemOut.from_orm(cart_item)
+    return await db.run(_create_cart_item, cart_item_in)
 
 # -------------------------------
 # READ - List cart items for user
 # -------------------------------
-@cart_router.get("/user/{user_id}", response_model=dict)
-def list_cart_items(
+def _list_cart_items(
+    db: Session,
+    user_id: int,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    count: str,
+):
+    query = db.query(CartItem).filter(CartItem.user_id == user_id)
+
+    ordered = apply_keyset(query, CartItem.id, CartItem.id, cursor, sort_key="id")
+    cart_items, has_more, total = fetch_page(query, ordered, skip, limit, count, cursor=cursor)
+
+    return Page[CartItemOut](
+        total=total,
+        items=cart_items,
+        next_cursor=next_cursor_for(cart_items, has_more, sort_key="id"),
+    )
+
+@cart_router.get("/user/{user_id}", response_model=Page[CartItemOut])
+async def list_cart_items(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     skip: int = 0,
     limit: int = Query(50, le=100),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimate", "none"] = "exact",
     # current_user: str = Depends(get_current_user)
 ):
-    query = db.query(CartItem).filter(CartItem.user_id == user_id)
+    return _json_page(await db.run(_list_cart_items, user_id, skip, limit, cursor, count))
 
-    total = query.count()
-    cart_items = query.offset(skip).limit(limit).all()
+# -------------------------------
+# READ - Cart view (items joined with their books)
+# -------------------------------
+def _cart_view(db: Session, user_id: int):
+    # One query for the whole cart; books that no longer exist show as unavailable
+    rows = (
+        db.query(
+            CartItem.id, CartItem.book_id, CartItem.quantity,
+            Book.title, Book.author, Book.image, Book.price, Book.stock,
+        )
+        .outerjoin(Book, Book.id == CartItem.book_id)
+        .filter(CartItem.user_id == user_id)
+        .order_by(CartItem.id)
+        .all()
+    )
 
-    cart_item_list = [CartItemOut.from_orm(item) for item in cart_items]
-    return {"total": total, "items": cart_item_list}
+    items = []
+    for row in rows:
+        line = row._asdict()
+        line["available"] = row.title is not None and (row.stock or 0) >= row.quantity
+        line["line_total"] = round((row.price or 0) * row.quantity, 2)
+        items.append(line)
+    return {
+        "user_id": user_id,
+        "items": items,
+        "total_quantity": sum(line["quantity"] for line in items),
+        "subtotal": round(sum(line["line_total"] for line in items), 2),
+    }
+
+@cart_router.get("/user/{user_id}/view", response_model=CartViewOut)
+async def view_user_cart(
+    user_id: int,
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    return await db.run(_cart_view, user_id)
 
 # -------------------------------
-# READ - Single cart item
+# UPDATE - Batch set quantities for a user's cart
 # -------------------------------
-@cart_router.get("/{cart_item_id}", response_model=CartItemOut)
-def get_cart_item(
-    cart_item_id: int, 
-    db: Session = Depends(get_db),
+def _update_user_cart(db: Session, user_id: int, cart_in: CartBatchUpdate):
+    # Last entry wins when a book is listed twice
+    quantities = {item.book_id: item.quantity for item in cart_in.items}
+    if not quantities:
+        return _cart_view(db, user_id)
+
+    book_ids = list(quantities)
+    known = {book_id for (book_id,) in db.query(Book.id).filter(Book.id.in_(book_ids))}
+    missing = [book_id for book_id in book_ids if book_id not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Books not found: {missing}")
+
+    removed = [book_id for book_id, quantity in quantities.items() if quantity == 0]
+    if removed:
+        db.query(CartItem).filter(CartItem.user_id == user_id, CartItem.book_id.in_(removed)).delete()
+    rows = [
+        {"user_id": user_id, "book_id": book_id, "quantity": quantity}
+        for book_id, quantity in quantities.items() if quantity > 0
+    ]
+    if rows:
+        db.execute(_cart_upsert(db, rows, add=False))
+
+    # All changes land in one transaction
+    db.commit()
+    return _cart_view(db, user_id)
+
+@cart_router.put("/user/{user_id}", response_model=CartViewOut)
+async def update_user_cart(
+    user_id: int,
+    cart_in: CartBatchUpdate,
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
+    return await db.run(_update_user_cart, user_id, cart_in)
+
+# -------------------------------
+# CHECKOUT - Turn the cart into stock decrements
+# -------------------------------
+def _checkout_cart(db: Session, user_id: int):
+    books = Book.__table__
+    cart = CartItem.__table__
+
+    # Server databases (READ COMMITTED): lock the user's cart lines first, so none
+    # can change between the stock UPDATE and the DELETE below. On SQLite the
+    # UPDATE itself takes the single write lock, so it stays the first statement.
+    if db.get_bind().dialect.name != "sqlite":
+        db.execute(select(cart.c.id).where(cart.c.user_id == user_id).with_for_update())
+
+    # One conditional UPDATE for the whole cart: each book is decremented only if
+    # it still has enough stock, checked and written atomically by the database.
+    # Concurrent checkouts only contend on the rows they share (no table locks,
+    # no read-then-write window).
+    reserved = {
+        row.id: row
+        for row in db.execute(
+            update(books)
+            .where(books.c.id == cart.c.book_id, cart.c.user_id == user_id, books.c.stock >= cart.c.quantity)
+            .values(stock=books.c.stock - cart.c.quantity, version=books.c.version + 1, updated_at=datetime.utcnow())
+            .returning(books.c.id, books.c.title, books.c.price, books.c.stock)
+        )
+    }
+
+    lines = db.query(CartItem.id, CartItem.book_id, CartItem.quantity).filter(CartItem.user_id == user_id).order_by(CartItem.id).all()
+    if not lines:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    short = [line.book_id for line in lines if line.book_id not in reserved]
+    if short:
+        # All or nothing: put back what was reserved
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Insufficient stock for books: {short}")
+
+    # Only the lines checked against the reservation above: one added since was
+    # neither charged nor decremented, so it stays in the cart
+    db.execute(delete(cart).where(cart.c.id.in_([line.id for line in lines])))
+    db.commit()
+
+    items = []
+    for line in lines:
+        book = reserved[line.book_id]
+        items.append({
+            "book_id": line.book_id,
+            "quantity": line.quantity,
+            "title": book.title,
+            "price": book.price,
+            "stock": book.stock,
+            "line_total": round((book.price or 0) * line.quantity, 2),
+        })
+    return {
+        "user_id": user_id,
+        "items": items,
+        "total_quantity": sum(item["quantity"] for item in items),
+        "subtotal": round(sum(item["line_total"] for item in items), 2),
+    }
+
+@cart_router.post("/user/{user_id}/checkout", response_model=CheckoutOut)
+async def checkout_user_cart(
+    user_id: int,
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    order = await db.run(_checkout_cart, user_id)
+    # Stock and versions changed
+    cache.invalidate(CATALOG)
+    return order
+
+# -------------------------------
+# READ - Single cart item
+# -------------------------------
+def _get_cart_item(db: Session, cart_item_id: int):
     cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id).first()
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
     return CartItemOut.from_orm(cart_item)
 
-# -------------------------------
-# UPDATE
-# -------------------------------
-@cart_router.put("/{cart_item_id}", response_model=CartItemOut)
-def update_cart_item(
+@cart_router.get("/{cart_item_id}", response_model=CartItemOut)
+async def get_cart_item(
     cart_item_id: int, 
-    cart_item_in: CartItemUpdate, 
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
+    return await db.run(_get_cart_item, cart_item_id)
+
+# -------------------------------
+# UPDATE
+# -------------------------------
+def _update_cart_item(db: Session, cart_item_id: int, cart_item_in: CartItemUpdate):
     cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id).first()
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
@@ -225,15 +819,19 @@ def update_cart_item(
     db.refresh(cart_item)
     return CartItemOut.from_orm(cart_item)
 
-# -------------------------------
-# DELETE
-# -------------------------------
-@cart_router.delete("/{cart_item_id}")
-def delete_cart_item(
+@cart_router.put("/{cart_item_id}", response_model=CartItemOut)
+async def update_cart_item(
     cart_item_id: int, 
-    db: Session = Depends(get_db),
+    cart_item_in: CartItemUpdate, 
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
+    return await db.run(_update_cart_item, cart_item_id, cart_item_in)
+
+# -------------------------------
+# DELETE
+# -------------------------------
+def _delete_cart_item(db: Session, cart_item_id: int):
     cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id).first()
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
@@ -242,18 +840,29 @@ def delete_cart_item(
     db.commit()
     return {"message": "Cart item deleted successfully"}
 
+@cart_router.delete("/{cart_item_id}")
+async def delete_cart_item(
+    cart_item_id: int, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    return await db.run(_delete_cart_item, cart_item_id)
+
 # -------------------------------
 # CLEAR USER CART
 # -------------------------------
+def _clear_user_cart(db: Session, user_id: int):
+    db.query(CartItem).filter(CartItem.user_id == user_id).delete()
+    db.commit()
+    return {"message": "User cart cleared successfully"}
+
 @cart_router.delete("/user/{user_id}/clear")
-def clear_user_cart(
+async def clear_user_cart(
     user_id: int, 
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
-    db.query(CartItem).filter(CartItem.user_id == user_id).delete()
-    db.commit()
-    return {"message": "User cart cleared successfully"}
+    return await db.run(_clear_user_cart, user_id)
 
 # =========================================================================
 # SERVICE REQUESTS ENDPOINTS
@@ -262,30 +871,39 @@ def clear_user_cart(
 # -------------------------------
 # CREATE
 # -------------------------------
-@service_requests_router.post("/", response_model=ServiceRequestOut, status_code=status.HTTP_201_CREATED)
-def create_service_request(
-    service_request_in: ServiceRequestCreate, 
-    db: Session = Depends(get_db),
-    # current_user: str = Depends(get_current_user)
-):
+def _create_service_request(db: Session, service_request_in: ServiceRequestCreate):
     service_request = ServiceRequest(**service_request_in.dict())
     db.add(service_request)
+    db.flush()
+    # Catalog matching and the acknowledgement mail happen in the background
+    job = enqueue(db, service_requests.CREATED, {"service_request_id": service_request.id})
+    job_id = job.id
     db.commit()
     db.refresh(service_request)
-    return ServiceRequestOut.from_orm(service_request)
+    return ServiceRequestCreatedOut(**ServiceRequestOut.from_orm(service_request).model_dump(), job_id=job_id)
+
+@service_requests_router.post("/", response_model=ServiceRequestCreatedOut, status_code=status.HTTP_201_CREATED)
+async def create_service_request(
+    service_request_in: ServiceRequestCreate, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    created = await db.run(_create_service_request, service_request_in)
+    job_queue.wake()
+    return created
 
 # -------------------------------
 # READ - List with pagination & filters
 # -------------------------------
-@service_requests_router.get("/", response_model=dict)
-def list_service_requests(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = Query(10, le=100),
-    user_id: Optional[int] = None,
-    status: Optional[str] = None,
-    title: Optional[str] = None,
-    # current_user: str = Depends(get_current_user)
+def _list_service_requests(
+    db: Session,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    count: str,
+    user_id: Optional[int],
+    status: Optional[str],
+    title: Optional[str],
 ):
     query = db.query(ServiceRequest)
 
@@ -296,36 +914,53 @@ def list_service_requests(
     if title:
         query = query.filter(ServiceRequest.title.ilike(f"%{title}%"))
 
-    total = query.count()
-    service_requests = query.offset(skip).limit(limit).all()
+    unfiltered = not (user_id or status or title)
+    estimate = (lambda: row_counter(ServiceRequest).get(db)) if unfiltered else None
 
-    service_request_list = [ServiceRequestOut.from_orm(sr) for sr in service_requests]
-    return {"total": total, "items": service_request_list}
+    ordered = apply_keyset(query, ServiceRequest.id, ServiceRequest.id, cursor, sort_key="id")
+    service_requests, has_more, total = fetch_page(query, ordered, skip, limit, count, estimate, cursor)
+
+    return Page[ServiceRequestOut](
+        total=total,
+        items=service_requests,
+        next_cursor=next_cursor_for(service_requests, has_more, sort_key="id"),
+    )
+
+@service_requests_router.get("/", response_model=Page[ServiceRequestOut])
+async def list_service_requests(
+    db: Database = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(10, le=100),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimate", "none"] = "exact",
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    title: Optional[str] = None,
+    # current_user: str = Depends(get_current_user)
+):
+    return _json_page(await db.run(_list_service_requests, skip, limit, cursor, count, user_id, status, title))
 
 # -------------------------------
 # READ - Single service request
 # -------------------------------
-@service_requests_router.get("/{request_id}", response_model=ServiceRequestOut)
-def get_service_request(
-    request_id: int, 
-    db: Session = Depends(get_db),
-    # current_user: str = Depends(get_current_user)
-):
+def _get_service_request(db: Session, request_id: int):
     service_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
     if not service_request:
         raise HTTPException(status_code=404, detail="Service request not found")
     return ServiceRequestOut.from_orm(service_request)
 
-# -------------------------------
-# UPDATE
-# -------------------------------
-@service_requests_router.put("/{request_id}", response_model=ServiceRequestOut)
-def update_service_request(
+@service_requests_router.get("/{request_id}", response_model=ServiceRequestOut)
+async def get_service_request(
     request_id: int, 
-    service_request_in: ServiceRequestUpdate, 
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
+    return await db.run(_get_service_request, request_id)
+
+# -------------------------------
+# UPDATE
+# -------------------------------
+def _update_service_request(db: Session, request_id: int, service_request_in: ServiceRequestUpdate):
     service_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
     if not service_request:
         raise HTTPException(status_code=404, detail="Service request not found")
@@ -337,38 +972,55 @@ def update_service_request(
     db.refresh(service_request)
     return ServiceRequestOut.from_orm(service_request)
 
+@service_requests_router.put("/{request_id}", response_model=ServiceRequestOut)
+async def update_service_request(
+    request_id: int, 
+    service_request_in: ServiceRequestUpdate, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    return await db.run(_update_service_request, request_id, service_request_in)
+
 # -------------------------------
 # UPDATE STATUS
 # -------------------------------
-@service_requests_router.patch("/{request_id}/status")
-def update_service_request_status(
+def _update_service_request_status(db: Session, request_id: int, status: str):
+    if not db.query(ServiceRequest.id).filter(ServiceRequest.id == request_id).first():
+        raise HTTPException(status_code=404, detail="Service request not found")
+
+    # Applied (and the contact notified) by a background job; poll GET /jobs/{job_id}
+    job = enqueue(db, service_requests.STATUS, {"service_request_id": request_id, "status": status})
+    job_id = job.id
+    db.commit()
+    return {"message": "Status update queued", "status": status, "job_id": job_id}
+
+@service_requests_router.patch("/{request_id}/status", status_code=status.HTTP_202_ACCEPTED)
+async def update_service_request_status(
     request_id: int,
     status: str,
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     # current_user: str = Depends(get_current_user)
 ):
-    service_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
-    if not service_request:
-        raise HTTPException(status_code=404, detail="Service request not found")
-
-    service_request.status = status
-    db.commit()
-    db.refresh(service_request)
-    return {"message": "Status updated successfully", "status": status}
+    queued = await db.run(_update_service_request_status, request_id, status)
+    job_queue.wake()
+    return queued
 
 # -------------------------------
 # DELETE
 # -------------------------------
-@service_requests_router.delete("/{request_id}")
-def delete_service_request(
-    request_id: int, 
-    db: Session = Depends(get_db),
-    # current_user: str = Depends(get_current_user)
-):
+def _delete_service_request(db: Session, request_id: int):
     service_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
     if not service_request:
         raise HTTPException(status_code=404, detail="Service request not found")
 
     db.delete(service_request)
     db.commit()
-    return {"message": "Service request deleted successfully"}
\ No newline at end of file
+    return {"message": "Service request deleted successfully"}
+
+@service_requests_router.delete("/{request_id}")
+async def delete_service_request(
+    request_id: int, 
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    return await db.run(_delete_service_request, request_id)
@@ -0,0 +1,76 @@
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from db.session import Database, get_db
+from models.user import User
+from core.security import verify_access_token
+from core.cache import cache
+from core import config
+
+
+# Shared auth dependencies for every router.
+# Tokens are verified once per worker (see core.security.verify_access_token)
+# and users are cached by id for USER_CACHE_TTL_SECONDS, so an authenticated
+# request normally costs no JWT decode and no database query.
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+
+# Cache group for user records
+USERS = "users"
+
+
+def _credentials_error():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    try:
+        claims = verify_access_token(token)
+    except Exception:
+        raise _credentials_error()
+    if claims.get("sub") is None:
+        raise _credentials_error()
+    return claims
+
+
+def get_current_user(claims: dict = Depends(get_token_claims)) -> str:
+    # The caller's email, straight from the token
+    return claims["sub"]
+
+
+def _user_record(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_active": user.is_active,
+    }
+
+
+def _find_user(db: Session, user_id, email: str):
+    # Tokens issued before the "uid" claim existed only carry the email
+    if user_id is not None:
+        user = db.get(User, user_id)
+    else:
+        user = db.query(User).filter(User.email == email).first()
+    return _user_record(user) if user else None
+
+
+async def get_current_account(claims: dict = Depends(get_token_claims), db: Database = Depends(get_db)) -> dict:
+    # The caller's user record (id, email, names, is_active)
+    user_id = claims.get("uid")
+    key = cache.key(USERS, user_id) if user_id is not None else None
+    user = cache.get(key) if key else None
+    if user is None:
+        user = await db.run(_find_user, user_id, claims["sub"])
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        if key:
+            cache.set(key, user, ttl=config.USER_CACHE_TTL_SECONDS)
+    return user
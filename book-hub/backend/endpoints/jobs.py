@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from db.session import Database, get_db
+from models.job import Job
+from schemas.job import JobOut
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+# -------------------------------
+# READ - Background job status (poll until done / failed)
+# -------------------------------
+def _get_job(db: Session, job_id: int):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobOut.from_orm(job)
+
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(
+    job_id: int,
+    db: Database = Depends(get_db),
+    # current_user: str = Depends(get_current_user)
+):
+    return await db.run(_get_job, job_id)
@@ -1,13 +1,49 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from db.session import Base, engine
-from endpoints import auth, book
+from starlette.concurrency import run_in_threadpool
+from endpoints import auth, book, jobs
+from core.cache import cache
+from core.security import token_cache
+from core import config, metrics
+from core.jobs import job_queue
+from core.compression import CompressionMiddleware
+from core.ratelimit import AdmissionMiddleware
+from core.warmup import warm_up
+
+logger = logging.getLogger("bookhub.startup")
+
+# Startup work runs here, not at import: importing the app stays cheap (tests,
+# tools, workers that are only forked) and every phase is timed on /metrics
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if config.INIT_DB_ON_STARTUP:
+        # Create/upgrade the tables and the search/facet indexes (blocking, so off the event loop)
+        from db.init_db import init_db
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
+        phase = time.perf_counter()
+        await run_in_threadpool(init_db)
+        metrics.startup_seconds["init_db"] = time.perf_counter() - phase
+    if config.WARMUP_ON_STARTUP:
+        for name, seconds in (await warm_up(app)).items():
+            metrics.startup_seconds[f"warmup_{name}"] = seconds
+    # Background job workers (service requests, similar books) live as long as the app
+    if config.JOBS_ENABLED:
+        await job_queue.start()
+    metrics.startup_seconds["total"] = time.perf_counter() - started
+    logger.info("started in %.3fs", metrics.startup_seconds["total"])
+    yield
+    await job_queue.stop()
 
 # Initialize the app
-app = FastAPI(title="Book Hub Backend APIs")
+app = FastAPI(title="Book Hub Backend APIs", lifespan=lifespan)
+
+# Per-client rate limits and load shedding (inside CORS, so browsers can read a 429/503)
+app.add_middleware(AdmissionMiddleware)
 
 # ✅ Add CORS middleware (Allow all origins, methods, and headers)
 app.add_middleware(
@@ -18,12 +54,31 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers (Authorization, Content-Type, etc.)
 )
 
+# gzip/brotli for responses over COMPRESSION_MIN_BYTES (inside the metrics, so they time it)
+app.add_middleware(CompressionMiddleware)
+
+# Request/SQL metrics for GET /metrics (outermost, so it times everything else)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.register_cache("catalog", cache)
+metrics.register_cache("token", token_cache)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(book.books_router)
 app.include_router(book.cart_router)
 app.include_router(book.service_requests_router)
+app.include_router(jobs.router)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to FastAPI JWT + Book Management"}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return cache.info()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
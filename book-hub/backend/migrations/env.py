@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from db.session import Base, engine
+
+# Register every model on Base.metadata (for --autogenerate)
+import models.book  # noqa: F401
+import models.user  # noqa: F401
+import models.job  # noqa: F401
+
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _include_object(obj, name, type_, reflected, compare_to):
+    # Tables without a model (the full-text index, see core/search.py) are
+    # managed by the app at startup; autogenerate must not drop them
+    return not (type_ == "table" and reflected and compare_to is None)
+
+
+def _configure(**kwargs):
+    # SQLite can only ALTER a table by copying it ("batch" mode)
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=_include_object,
+        render_as_batch=engine.dialect.name == "sqlite",
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=engine.url.render_as_string(hide_password=False), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # init_db passes its own connection; the alembic command line does not
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
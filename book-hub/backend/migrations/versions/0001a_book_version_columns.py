@@ -0,0 +1,41 @@
+"""book version columns
+
+books.version (the ORM's optimistic-locking counter behind the ETags) and
+books.updated_at (Last-Modified). Existing books start at version 1 and are
+stamped as updated now.
+
+Databases that already have both columns (built while 0001 still created
+them) are left as they are.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 00:02:47.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _book_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('books')}
+
+
+def upgrade():
+    existing = _book_columns()
+    # Plain ADD COLUMN (no batch copy): the search/facet triggers on books stay in place
+    if 'version' not in existing:
+        op.add_column('books', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    if 'updated_at' not in existing:
+        op.add_column('books', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute("UPDATE books SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
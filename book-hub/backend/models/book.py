@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index, UniqueConstraint, func
 from datetime import datetime
 from db.session import Base
 
@@ -21,6 +21,23 @@ class Book(Base):
     language = Column(String)
     publisher = Column(String)
     stock = Column(Integer)
+    # Bumped by the ORM on every UPDATE; drives ETags. Both columns are added to
+    # existing databases by migration 0001a (run by init_db on startup)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # Browse filters and (value, id) keyset sorts
+    __table_args__ = (
+        Index("ix_books_genre_id", "genre", "id"),
+        Index("ix_books_language_id", "language", "id"),
+        Index("ix_books_publisher_id", "publisher", "id"),
+        Index("ix_books_price_id", "price", "id"),
+        Index("ix_books_rating_id", "rating", "id"),
+        # Service-request title matching (core/service_requests.py)
+        Index("ix_books_title_lower", func.lower(title)),
+    )
 
 class CartItem(Base):
     __tablename__ = "cart_items"
@@ -30,6 +47,9 @@ class CartItem(Base):
     book_id = Column(Integer)
     quantity = Column(Integer, default=1)
 
+    # One row per (user, book); also serves lookups by user_id alone
+    __table_args__ = (UniqueConstraint("user_id", "book_id", name="uq_cart_items_user_book"),)
+
 
 class ServiceRequest(Base):
     __tablename__ = "service_requests"
@@ -42,4 +62,11 @@ class ServiceRequest(Base):
     description = Column(Text)
     price = Column(Float)
     contact_email = Column(String)
-    status = Column(String, default="pending")
\ No newline at end of file
+    status = Column(String, default="pending")
+    # Set in the background when the requested title is found in the catalog
+    matched_book_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_service_requests_user_id_status", "user_id", "status"),
+        Index("ix_service_requests_status", "status"),
+    )
\ No newline at end of file
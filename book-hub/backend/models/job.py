@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from datetime import datetime
+from db.session import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # queued -> running -> done / failed (running again if its lease runs out)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(JSON)
+    error = Column(Text)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Claiming due jobs
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
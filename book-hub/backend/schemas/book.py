@@ -1,7 +1,21 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from typing import Generic, List, Optional, Tuple, Type, TypeVar, Union
 from datetime import datetime
 
+# =========================================================================
+# PAGINATION
+# =========================================================================
+
+T = TypeVar("T")
+
+# One page of a list endpoint; `total` is None with count=none
+class Page(BaseModel, Generic[T]):
+    total: Optional[int] = None
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
 # =========================================================================
 # BOOK SCHEMAS
 # =========================================================================
@@ -41,10 +55,54 @@ class BookUpdate(BaseModel):
 
 class BookOut(BookBase):
     id: int
+    version: Optional[int] = None
     created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Sparse fieldsets (?fields=title,price): a BookOut cut down to the given fields.
+# One model per combination, built on first use.
+BOOK_FIELDS = tuple(BookOut.model_fields)
+
+@lru_cache(maxsize=256)
+def book_projection(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    return create_model(
+        "BookFieldsOut",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (BookOut.model_fields[name].annotation, BookOut.model_fields[name]) for name in fields},
+    )
+
+# Lighter list view (?view=summary): everything a book card needs, no description
+class BookSummaryOut(BaseModel):
+    id: int
+    title: str
+    author: str
+    genre: str
+    price: float
+    rating: float
+    image: str
+    language: str
+    publisher: str
+    stock: int
+    version: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
+# GET /books/batch: found books in request order, then what wasn't found
+class BookBatchOut(BaseModel):
+    items: List[BookOut]
+    missing: List[Union[int, str]]
+
+# GET /books/{book_id}/similar: best match first, score is a cosine in [-1, 1]
+class SimilarBookOut(BaseModel):
+    score: float
+    book: BookSummaryOut
+
+class SimilarBooksOut(BaseModel):
+    book_id: int
+    items: List[SimilarBookOut]
+
 
 # =========================================================================
 # CART ITEM SCHEMAS
@@ -67,6 +125,48 @@ class CartItemOut(CartItemBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Batch update of a user's cart: sets each book's quantity (0 removes it)
+class CartItemQuantity(BaseModel):
+    book_id: int
+    quantity: int = Field(ge=0)
+
+class CartBatchUpdate(BaseModel):
+    items: List[CartItemQuantity] = Field(max_length=500)
+
+# Cart with the book details the cart page needs
+class CartLineOut(BaseModel):
+    id: int
+    book_id: int
+    quantity: int
+    title: Optional[str] = None
+    author: Optional[str] = None
+    image: Optional[str] = None
+    price: Optional[float] = None
+    stock: Optional[int] = None
+    available: bool
+    line_total: float
+
+class CartViewOut(BaseModel):
+    user_id: int
+    items: List[CartLineOut]
+    total_quantity: int
+    subtotal: float
+
+# Result of POST /cart/user/{user_id}/checkout; stock is what remains afterwards
+class CheckoutLineOut(BaseModel):
+    book_id: int
+    quantity: int
+    title: Optional[str] = None
+    price: Optional[float] = None
+    stock: Optional[int] = None
+    line_total: float
+
+class CheckoutOut(BaseModel):
+    user_id: int
+    items: List[CheckoutLineOut]
+    total_quantity: int
+    subtotal: float
+
 
 # =========================================================================
 # SERVICE REQUEST SCHEMAS
@@ -96,6 +196,11 @@ class ServiceRequestUpdate(BaseModel):
 class ServiceRequestOut(ServiceRequestBase):
     id: int
     status: str
+    matched_book_id: Optional[int] = None
     created_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Creation returns right away; catalog matching and the acknowledgement run as job `job_id`
+class ServiceRequestCreatedOut(ServiceRequestOut):
+    job_id: int
\ No newline at end of file
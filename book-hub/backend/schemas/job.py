@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Optional
+from datetime import datetime
+
+# Response model for GET /jobs/{job_id}
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)